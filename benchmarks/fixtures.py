@@ -0,0 +1,82 @@
+import io
+import numpy as np
+import pandas as pd
+from datetime import date, timedelta
+from utils.codes import alpha2, states, JHU_names
+
+#Shape of the final JHU global time series | 289 rows, 1/22/20 to 3/9/23
+ROWS = 289
+DAYS = 1143
+PROVINCES = ('Canada', 'China', 'Australia', 'United Kingdom', 'France', 'Netherlands', 'Denmark')
+
+def countries():
+    names = []
+    for name in alpha2.values():
+        name = JHU_names.get(name, name)
+        if name not in names:
+            names.append(name)
+    return names
+
+def dates(days=DAYS):
+    start = date(2020, 1, 22)
+    return [f'{d.month}/{d.day}/{d.year % 100}' for d in (start + timedelta(n) for n in range(days))]
+
+def jhu_frame(metric='confirmed', rows=ROWS, days=DAYS, seed=0):
+    '''Synthetic JHU time series with the real row count, country names and date columns'''
+    rng = np.random.default_rng(seed + sum(map(ord, metric)))
+    names = countries()
+    regions = [('', name) for name in names if name not in PROVINCES]
+    for n in range(rows - len(regions)):
+        country = PROVINCES[n % len(PROVINCES)]
+        regions.append((f'{country} Province {n}', country))
+    regions = regions[:rows]
+    daily = rng.poisson(rng.uniform(0, 500, (len(regions), 1)), (len(regions), days))
+    frame = pd.DataFrame(np.cumsum(daily, axis=1), columns=dates(days))
+    frame.insert(0, 'Long', rng.uniform(-180, 180, len(regions)).round(4))
+    frame.insert(0, 'Lat', rng.uniform(-90, 90, len(regions)).round(4))
+    frame.insert(0, 'Country/Region', [country for _, country in regions])
+    frame.insert(0, 'Province/State', [province or None for province, _ in regions])
+    return frame
+
+def jhu_csv(metric='confirmed', rows=ROWS, days=DAYS, seed=0):
+    buffer = io.StringIO()
+    jhu_frame(metric, rows, days, seed).to_csv(buffer, index=False)
+    return buffer.getvalue()
+
+WOM_COLUMNS = ('#', 'Country,<br>Other', 'Total<br>Cases', 'New<br>Cases', 'Total<br>Deaths', 'New<br>Deaths', 'Total<br>Recovered', 'New<br>Recovered', 'Active<br>Cases', 'Serious,<br>Critical', 'Tot&nbsp;Cases/<br>1M pop', 'Deaths/<br>1M pop', 'Total<br>Tests', 'Tests/<br>1M pop', 'Population', 'Continent')
+US_COLUMNS = ('#', 'USA<br>State', 'Total<br>Cases', 'New<br>Cases', 'Total<br>Deaths', 'New<br>Deaths', 'Total<br>Recovered', 'Active<br>Cases', 'Tot&nbsp;Cases/<br>1M pop', 'Deaths/<br>1M pop', 'Total<br>Tests', 'Tests/<br>1M pop', 'Population')
+
+def _cell(rng, kind):
+    value = int(rng.integers(0, 10**7))
+    if kind == 'new':
+        return f'+{value // 1000:,}' if rng.random() < 0.7 else ''
+    if rng.random() < 0.03:
+        return 'N/A'
+    return f'{value:,}'
+
+def _table(table_id, columns, names, rng):
+    head = ''.join(f'<th width="30">{column}</th>' for column in columns)
+    rows = []
+    for n, name in enumerate(names):
+        cells = [f'<td style="font-size:12px;">{n + 1}</td>', f'<td style="font-weight: bold; font-size:15px; text-align:left;"><a class="mt_a" href="country/{name.lower()}/">{name}</a></td>']
+        for column in columns[2:]:
+            if column == 'Continent':
+                cells.append('<td style="display:none" data-continent="Europe">Europe</td>')
+            else:
+                cells.append(f'<td style="font-weight: bold; text-align:right">{_cell(rng, "new" if column.startswith("New") else "total")}</td>')
+        rows.append('<tr style="">\n' + '\n'.join(cells) + '\n</tr>')
+    total = ''.join(f'<td>{_cell(rng, "total") if i > 1 else ("Total:" if i == 1 else "")}</td>' for i in range(len(columns)))
+    display = '' if table_id.endswith('today') else 'display:none;'
+    return (f'<table id="{table_id}" class="table table-bordered table-hover main_table_countries" style="width:100%;margin-top: 0px !important;{display}">'
+            f'<thead><tr>{head}</tr></thead><tbody>\n' + '\n'.join(rows) + f'\n</tbody><tbody class="total_row_body body_world"><tr class="total_row">{total}</tr></tbody></table>')
+
+def wom_html(us=False, seed=0):
+    '''Synthetic Worldometer page with the same table ids, headers, cell formats and number of tables as the real one'''
+    rng = np.random.default_rng(seed)
+    if us:
+        names, columns, ids = sorted(set(states.values())), US_COLUMNS, ('usa_table_countries_today', 'usa_table_countries_yesterday', 'usa_table_countries_yesterday2')
+    else:
+        names, columns, ids = ['World'] + [name for name in alpha2.values()], WOM_COLUMNS, ('main_table_countries_today', 'main_table_countries_yesterday', 'main_table_countries_yesterday2')
+    padding = '<div class="news_post">' + 'Lorem ipsum dolor sit amet. ' * 40 + '</div>\n'
+    body = padding * 20 + '\n'.join(_table(table_id, columns, names, rng) for table_id in ids) + padding * 20
+    return f'<!DOCTYPE html><html><head><title>Coronavirus Update (Live)</title></head><body>{body}</body></html>'
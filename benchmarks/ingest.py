@@ -0,0 +1,42 @@
+'''Full re-parse against appending one new day, with and without upstream corrections | python -m benchmarks.ingest'''
+import io
+import timeit
+import numpy as np
+from benchmarks.fixtures import jhu_frame
+from utils.data import Snapshot
+from utils.refresher import parse_jhu
+
+METRICS = ('confirmed', 'deaths', 'recovered')
+
+def csv(frame):
+    buffer = io.StringIO()
+    frame.to_csv(buffer, index=False)
+    return buffer.getvalue()
+
+def main():
+    frames = [jhu_frame(metric) for metric in METRICS]
+    yesterday = [csv(frame.iloc[:, :-1]) for frame in frames]
+    today = [csv(frame) for frame in frames]
+    corrected = []
+    for frame in frames:
+        frame = frame.copy()
+        frame.iloc[[3, 50, 120], 100] += 7
+        corrected.append(csv(frame))
+
+    previous = Snapshot().update('jhu', parse_jhu(None, *yesterday))
+    for texts in (today, corrected):
+        full = parse_jhu(None, *texts)['jhu']
+        incremental = parse_jhu(previous.jhu, *texts)['jhu']
+        assert np.array_equal(full.dates, incremental.dates)
+        assert all(np.array_equal(getattr(full, metric), getattr(incremental, metric)) for metric in METRICS)
+
+    number = 10
+    full = timeit.timeit(lambda: parse_jhu(None, *today), number=number) / number
+    append = timeit.timeit(lambda: parse_jhu(previous.jhu, *today), number=number) / number
+    fix = timeit.timeit(lambda: parse_jhu(previous.jhu, *corrected), number=number) / number
+    print(f'full parse                      {full * 1000:8.1f} ms')
+    print(f'append one day                  {append * 1000:8.1f} ms')
+    print(f'append one day, 9 fixed rows    {fix * 1000:8.1f} ms')
+
+if __name__ == '__main__':
+    main()
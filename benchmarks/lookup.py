@@ -0,0 +1,34 @@
+'''Compare the per country index with the old substring scan | python -m benchmarks.lookup'''
+import timeit
+import numpy as np
+from benchmarks.fixtures import jhu_frame
+from utils.data import build_series
+
+def scan(frames, location):
+    confirmed_df, deaths_df, recovered_df = frames
+    return [df[df['Country/Region'].str.contains(location, na=False)].iloc[:,4:].sum().values for df in (confirmed_df, recovered_df, deaths_df)]
+
+def lookup(series, location):
+    return [series[location][metric] for metric in ('confirmed', 'recovered', 'deaths')]
+
+def main():
+    frames = [jhu_frame(metric) for metric in ('confirmed', 'deaths', 'recovered')]
+    build = timeit.timeit(lambda: build_series(*frames), number=5) / 5
+    store = build_series(*frames)
+    dates, series = store.dates, store.series
+
+    locations = ('US', 'Italy', 'Canada', 'China', 'Germany')
+    for location in locations:
+        assert all(np.array_equal(a, b) for a, b in zip(scan(frames, location), lookup(series, location)))
+
+    number = 200
+    scan_time = timeit.timeit(lambda: [scan(frames, location) for location in locations], number=number) / (number * len(locations))
+    lookup_time = timeit.timeit(lambda: [lookup(series, location) for location in locations], number=number) / (number * len(locations))
+    print(f'{len(frames[0])} rows x {len(dates)} days')
+    print(f'build index once     {build * 1000:10.3f} ms')
+    print(f'substring scan       {scan_time * 1e6:10.1f} us per graph')
+    print(f'index lookup         {lookup_time * 1e6:10.1f} us per graph')
+    print(f'speedup              {scan_time / lookup_time:10.0f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,18 @@
+'''Memory held for the JHU time series, DataFrames against the int32 store | python -m benchmarks.memory'''
+from benchmarks.fixtures import jhu_csv
+from utils.refresher import parse_csv
+from utils.data import build_series
+
+def main():
+    frames = [parse_csv(jhu_csv(metric)) for metric in ('confirmed', 'deaths', 'recovered')]
+    store = build_series(*frames)
+    before = sum(frame.memory_usage(deep=True).sum() for frame in frames)
+    after = store.nbytes
+    matrices = sum(getattr(store, metric).nbytes for metric in ('confirmed', 'deaths', 'recovered'))
+    print(f'{len(store.countries)} rows x {len(store.dates)} days')
+    print(f'DataFrames         {before / 2**20:8.2f} MiB')
+    print(f'int32 store        {after / 2**20:8.2f} MiB ({matrices / 2**20:.2f} MiB matrices, rest country sums, dates and names)')
+    print(f'reduction          {before / after:8.1f}x')
+
+if __name__ == '__main__':
+    main()
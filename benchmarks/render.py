@@ -0,0 +1,45 @@
+'''Stat graph render time and worker peak RSS, matplotlib against the raster backend | python -m benchmarks.render
+
+Each backend runs in a fresh worker process started the same way as the render pool's, so its peak RSS covers only its own imports and graphs.
+'''
+import multiprocessing
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+from utils import render
+from utils.pool import CONTEXT
+
+def measure(backend, number):
+    #Peak RSS of the bare worker, before the backend is imported
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    from benchmarks.fixtures import jhu_frame
+    from utils.data import METRICS, build_series
+    module = __import__(f'utils.{backend}', fromlist=['plot'])
+    series = build_series(*[jhu_frame(metric) for metric in METRICS])
+    lines = [(name, series.series['Canada'][metric], style) for name, metric, style in render.STAT_LINES]
+    data = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.perf_counter()
+    module.init()
+    init = time.perf_counter() - start
+    times = {}
+    for graph_type in render.TITLES:
+        module.plot(series.dates, lines, graph_type)
+        start = time.perf_counter()
+        for _ in range(number):
+            png = module.plot(series.dates, lines, graph_type)
+        times[graph_type] = ((time.perf_counter() - start) / number, len(png))
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return init, times, base, data, peak
+
+def main():
+    number = 10
+    for backend in ('render', 'raster'):
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context(CONTEXT)) as pool:
+            init, times, base, data, peak = pool.submit(measure, backend, number).result()
+        print(f'{"matplotlib" if backend == "render" else backend} | init {init * 1000:.0f} ms | peak RSS {peak / 1024:.1f} MiB, {(peak - data) / 1024:.1f} MiB over the worker with data loaded ({base / 1024:.1f} MiB bare)')
+        for graph_type, (seconds, size) in times.items():
+            print(f'  {graph_type:8} {seconds * 1000:8.1f} ms  {size / 1024:6.1f} KiB')
+
+if __name__ == '__main__':
+    main()
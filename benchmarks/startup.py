@@ -0,0 +1,107 @@
+'''Startup cost | python -m benchmarks.startup
+
+Import time of each module the bot loads, each in a fresh interpreter so shared dependencies count for every module.
+Time to first command, from interpreter start until the bot has its cogs loaded and can build a stat embed.
+Time until Stats can serve commands, parsing downloads against loading the saved snapshot.
+The cold path here starts from downloaded text, a real cold boot also waits for every download first.
+Nothing connects to Discord, so gateway login time is not included.
+'''
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.fixtures import jhu_csv, wom_html
+from utils.data import Snapshot, load_snapshot, save_snapshot
+from utils.refresher import parse_jhu, parse_worldometer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ('numpy', 'pandas', 'matplotlib.pyplot', 'discord', 'aiohttp', 'asyncpraw', 'google.cloud.logging',
+           'utils.data', 'utils.refresher', 'utils.render', 'cogs.Stats', 'cogs.Reddit', 'cogs.Help')
+
+#Stand in for the untracked config.py, pointed at a saved snapshot
+CONFIG = '''
+token = dbl_token = redditID = redditSecret = user_agent = ''
+snapshot_path = {path!r}
+voice_path = {voice!r}
+'''
+
+#Run in a fresh interpreter with a config module next to it
+FIRST_COMMAND = '''
+import time
+start = time.perf_counter()
+import asyncio, importlib.util, logging, sys
+asyncio.set_event_loop(asyncio.new_event_loop())
+logging.getLogger('covid-19').disabled = True
+spec = importlib.util.spec_from_file_location('bot', 'covid-19.py')
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+imported = time.perf_counter()
+bot = module.Coronavirus()
+constructed = time.perf_counter()
+embed = bot.get_cog('Stats').statEmbed(bot.refresher.snapshot, 'ALL', '')
+assert embed is not None
+served = time.perf_counter()
+print(imported - start, constructed - start, served - start, sorted(bot.cogs))
+'''
+
+def run(code, env=None):
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env, capture_output=True, text=True)
+    if result.returncode:
+        return None, result.stderr.strip().splitlines()[-1]
+    return result.stdout.split(maxsplit=3), None
+
+def imports(env):
+    for name in MODULES:
+        out, error = run(f'import time; start = time.perf_counter(); import {name}; print(time.perf_counter() - start)', env)
+        print(f'  {name:22} {float(out[0]) * 1000:8.1f} ms' if out else f'  {name:22} {error}')
+
+#Environment for a fresh interpreter with config.py in directory
+def environment(directory, snapshot):
+    path = os.path.join(directory, 'snapshot.dat')
+    save_snapshot(snapshot, path)
+    with open(os.path.join(directory, 'config.py'), 'w') as f:
+        f.write(CONFIG.format(path=path, voice=os.path.join(directory, 'voice.db')))
+    return {**os.environ, 'PYTHONPATH': os.pathsep.join([directory, ROOT])}
+
+def first_command(env):
+    out, error = run(FIRST_COMMAND, env)
+    if out is None:
+        print(f'  failed | {error}')
+        return
+    imported, constructed, served, cogs = out
+    print(f'  bot module imported               {float(imported) * 1000:8.1f} ms')
+    print(f'  cogs loaded, snapshot loaded      {float(constructed) * 1000:8.1f} ms')
+    print(f'  first stat embed built            {float(served) * 1000:8.1f} ms')
+    print(f'  cogs {cogs}')
+
+def main():
+    csvs = [jhu_csv(metric) for metric in ('confirmed', 'deaths', 'recovered')]
+    pages = [wom_html(), wom_html(us=True)]
+
+    start = time.perf_counter()
+    snapshot = Snapshot().update('jhu', parse_jhu(None, *csvs)).update('worldometer', parse_worldometer(None, *pages))
+    cold = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'snapshot.dat')
+        save_snapshot(snapshot, path)
+        size = os.path.getsize(path)
+        start = time.perf_counter()
+        loaded = load_snapshot(path)
+        warm = time.perf_counter() - start
+
+    assert loaded.ready and loaded.version == snapshot.version and loaded.world == snapshot.world
+    print(f'cold boot (parse only, no download) {cold * 1000:8.1f} ms')
+    print(f'warm boot (snapshot file)           {warm * 1000:8.1f} ms')
+    print(f'snapshot file size                  {size / 2**20:8.2f} MiB')
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = environment(directory, snapshot)
+        print('import time per module')
+        imports(env)
+        print('time to first command')
+        first_command(env)
+
+if __name__ == '__main__':
+    main()
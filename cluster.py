@@ -0,0 +1,71 @@
+'''Run the bot as several processes, each owning a contiguous range of shards | python cluster.py
+
+config.clusters sets the number of processes, config.shard_count the total shards (Discord's recommendation without it)
+The supervisor restarts a cluster that exits and sums every cluster's counts over a local unix socket
+'''
+import aiohttp
+import asyncio
+import logging
+import signal
+import sys
+import config
+from utils.cluster import ClusterServer, shard_ranges
+
+logger = logging.getLogger('covid-19')
+
+#Restart delay after a crash, doubled while a cluster keeps crashing quickly
+BACKOFF = 5
+MAX_BACKOFF = 300
+#A cluster that ran this long counts as healthy again
+HEALTHY = 600
+
+async def recommended_shards():
+    async with aiohttp.ClientSession() as session:
+        async with session.get('https://discord.com/api/v8/gateway/bot', headers={'Authorization': f'Bot {config.token}'}) as r:
+            r.raise_for_status()
+            return (await r.json())['shards']
+
+async def supervise(cluster, shard_ids, shard_count, ipc, stopping):
+    loop = asyncio.get_event_loop()
+    backoff = BACKOFF
+    while not stopping.is_set():
+        started = loop.time()
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, 'covid-19.py', '--cluster', str(cluster), '--shard-count', str(shard_count), '--ipc', ipc,
+            '--shards', *map(str, shard_ids))
+        logger.info(f'Cluster {cluster} started with shards {shard_ids[0]}-{shard_ids[-1]} as pid {process.pid}')
+        wait = asyncio.ensure_future(process.wait())
+        stop = asyncio.ensure_future(stopping.wait())
+        await asyncio.wait([wait, stop], return_when=asyncio.FIRST_COMPLETED)
+        stop.cancel()
+        if stopping.is_set():
+            if process.returncode is None:
+                process.terminate()
+            await wait
+            return
+        backoff = BACKOFF if loop.time() - started > HEALTHY else min(backoff * 2, MAX_BACKOFF)
+        logger.warning(f'Cluster {cluster} exited with code {process.returncode}, restarting in {backoff}s')
+        try:
+            await asyncio.wait_for(stopping.wait(), backoff)
+        except asyncio.TimeoutError:
+            pass
+
+async def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s:%(levelname)s:%(name)s: %(message)s')
+    shard_count = getattr(config, 'shard_count', None) or await recommended_shards()
+    clusters = min(getattr(config, 'clusters', 2), shard_count)
+    ipc = getattr(config, 'ipc_path', './data/cluster.sock')
+
+    server = ClusterServer(ipc)
+    await server.start()
+    stopping = asyncio.Event()
+    loop = asyncio.get_event_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+
+    logger.info(f'Starting {clusters} clusters for {shard_count} shards')
+    await asyncio.gather(*(supervise(cluster, shard_ids, shard_count, ipc, stopping) for cluster, shard_ids in enumerate(shard_ranges(shard_count, clusters))))
+    await server.stop()
+
+if __name__ == '__main__':
+    asyncio.run(main())
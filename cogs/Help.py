@@ -10,12 +10,6 @@ class Help(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    def total_users(self):
-        users = 0
-        for s in self.bot.guilds:
-            users += len(s.members)
-        return users
-
     @commands.command(name='help', aliases=['h', 'commands'])
     @commands.cooldown(3, 10, commands.BucketType.user)
     async def help(self, ctx):
@@ -26,7 +20,7 @@ class Help(commands.Cog):
             colour=discord.Colour.red(),
             timestamp=datetime.utcnow()
             )
-        embed.add_field(name='```.c stat <country/all> <state>```', value='Show **Confirmed** (new cases), **Deaths** (new deaths), and **Recovered** \n React with 📈 for a linear graph or 📉 for a log graph \n •For any country you may type the **full name** or **[ISO 3166-1 codes](https://en.wikipedia.org/wiki/ISO_3166-1)** \n __Example:__ **.c stat Italy** | **.c stat IT** | **.c stat ITA** \n •If the country or state\'s full name is two words, enclose them in **quotation marks** \n __Example:__ **.c stat "South Korea"** | **.c stat US "New York"** \n •If you would like stats on a specific **state (full name or abbreviated)** in the US, put it after the country name \n __Example:__ **.c stat US California** or **.c stat US CA**', inline=False)
+        embed.add_field(name='```.c stat <country/all> <state/more countries>```', value='Show **Confirmed** (new cases), **Deaths** (new deaths), and **Recovered** \n React with 📈 for a linear graph or 📉 for a log graph \n •For any country you may type the **full name** or **[ISO 3166-1 codes](https://en.wikipedia.org/wiki/ISO_3166-1)** \n __Example:__ **.c stat Italy** | **.c stat IT** | **.c stat ITA** \n •If the country or state\'s full name is two words, enclose them in **quotation marks** \n __Example:__ **.c stat "South Korea"** | **.c stat US "New York"** \n •If you would like stats on a specific **state (full name or abbreviated)** in the US, put it after the country name \n __Example:__ **.c stat US California** or **.c stat US CA** \n •List several countries to compare them side by side \n __Example:__ **.c stat Italy Spain France**', inline=False)
         embed.add_field(name='```.c graph <linear/log> <confirmed/recovered/deaths> <country names>```', value='Display graph for a single country or multiple countries, choose between graph type and case type | Same rules for country names apply \n __Example:__ **.c graph log deaths nl deu ita usa chn kor jpn esp**')
         embed.add_field(name='```.c reddit <category>```', value='Return posts of given category from [r/Coronavirus](https://www.reddit.com/r/Coronavirus/) \n Shows 5 posts at a time (up to first 15) Use ⬅️ and ➡️ to scroll through \n **<category>** - `Hot` | `New` | `Top`', inline=False)
         embed.add_field(name='```.c info```', value='Return additional info about the bot such as server and user count', inline=False)
@@ -46,9 +40,8 @@ class Help(commands.Cog):
             timestamp=datetime.utcnow()
         )
         embed.add_field(name='Command Prefix', value='`.c` or `@mention`')
-        users = self.total_users()
-        embed.add_field(name='Servers | Shards', value=f'<:servers:689502498251341953> {len(self.bot.guilds)} | {len(self.bot.shards)}')
-        embed.add_field(name='Users', value=f'<:user:689502620590669912> {users}')
+        embed.add_field(name='Servers | Shards', value=f'<:servers:689502498251341953> {self.bot.counters.all_guilds} | {self.bot.counters.all_shards}')
+        embed.add_field(name='Users', value=f'<:user:689502620590669912> {self.bot.counters.all_users}')
         embed.add_field(name='Bot Source Code', value='<:github:689501322969350158> [Github](https://github.com/picklejason/coronavirus-bot)')
         embed.add_field(name='Bot Invite', value='<:discord:689486285349715995> [Link](https://discordapp.com/api/oauth2/authorize?client_id=683462722368700526&permissions=59456&scope=bot)')
         embed.add_field(name='Donate', value='<:Kofi:689483361785217299> [Ko-fi](https://ko-fi.com/picklejason)')
@@ -84,6 +77,10 @@ class Help(commands.Cog):
             message = 'To prevent spam, the command has been rate limited to 3 times every 10 seconds'
             logger.info(f'Rate limit reached by {ctx.message.author}({ctx.message.author.id}) in {ctx.message.guild}({ctx.message.guild.id})')
             await ctx.send(message)
+        elif isinstance(error, commands.CommandInvokeError):
+            #A failed command, e.g. a render that timed out or a worker pool that broke under it
+            logger.error(f'Command \"{ctx.message.content}\" failed', exc_info=error.original)
+            await ctx.send('Something went wrong, please try again in a moment')
 
     @commands.command(name='reload', aliases=['r'])
     @commands.is_owner()
@@ -1,18 +1,53 @@
 import discord
-import praw
-import asyncio
 import config
+import time
 from datetime import datetime
 from discord.ext import commands
+from utils.cache import SingleFlight
+
+#Listing of each category, 15 posts shown 5 to a page
+LISTINGS = {'Hot': 'hot', 'New': 'new', 'Top': 'top'}
+POSTS = 15
+PAGE = 5
 
 class Reddit(commands.Cog):
 
     def __init__(self, bot):
         self.bot = bot
-
-    red = praw.Reddit(client_id=config.redditID,
-                    client_secret=config.redditSecret,
-                    user_agent=config.user_agent)
+        self.client = None
+        self.ttl = getattr(config, 'reddit_ttl', 120)
+        #category: (expires, embed fields for every post)
+        self.listings = {}
+        self.flights = SingleFlight()
+
+    def cog_unload(self):
+        if self.client is not None:
+            self.bot.loop.create_task(self.client.close())
+
+    #asyncpraw is imported and the client built on the first reddit command instead of when the cog loads
+    @property
+    def red(self):
+        if self.client is None:
+            import asyncpraw
+            self.client = asyncpraw.Reddit(client_id=config.redditID,
+                            client_secret=config.redditSecret,
+                            user_agent=config.user_agent)
+        return self.client
+
+    async def fetch(self, category):
+        subreddit = await self.red.subreddit('Coronavirus')
+        fields = []
+        async for s in getattr(subreddit, LISTINGS[category])(limit=POSTS):
+            fields.append((f'<:upvote:689186080070959207> **{s.score}** | Posted by u/{s.author} on {datetime.utcfromtimestamp(s.created_utc).strftime("%m/%d/%y %H:%M:%S")}', f'[{s.title}](https://www.reddit.com{s.permalink})'))
+        self.listings[category] = (time.monotonic() + self.ttl, fields)
+        return fields
+
+    #Posts of a category | One request fills every page and is reused for ttl seconds
+    async def posts(self, category):
+        expires, fields = self.listings.get(category, (0, None))
+        if expires > time.monotonic():
+            return fields
+        return await self.flights.do(category, self.fetch, category)
 
     #Reddit Command | Returns 5 posts (Hot, New, Top) from the subreddit r/Coronavirus
     @commands.command()
@@ -28,15 +63,12 @@ class Reddit(commands.Cog):
 
         category = category.title()
 
-        if category == 'Hot':
-            submissions = list(self.red.subreddit('Coronavirus').hot(limit=5))
-        elif category == 'New':
-            submissions = list(self.red.subreddit('Coronavirus').new(limit=5))
-        elif category == 'Top':
-            submissions = list(self.red.subreddit('Coronavirus').top(limit=5))
-        else:
+        if category not in LISTINGS:
             await ctx.send('Please enter one of the following categories: Hot, New, Top')
             return
+        #The whole listing is kept with the message, so turning pages needs no requests
+        fields = await self.posts(category)
+        pages = max(-(-len(fields) // PAGE), 1)
 
         index = 1
 
@@ -45,56 +77,36 @@ class Reddit(commands.Cog):
         url = 'https://www.reddit.com/r/Coronavirus/'
         embed = discord.Embed(title='/r/Coronavirus', description=description, colour=discord.Colour.red(), timestamp=timestamp, url=url)
 
-        for s in submissions:
-            embed.add_field(name=f'<:upvote:689186080070959207> **{s.score}** | Posted by u/{s.author} on {datetime.fromtimestamp(s.created).strftime("%m/%d/%y %H:%M:%S")}', value=f'[{s.title}](https://www.reddit.com{s.permalink})', inline=False)
+        for name, value in fields[:PAGE]:
+            embed.add_field(name=name, value=value, inline=False)
 
         embed.set_thumbnail(url='https://styles.redditmedia.com/t5_2x4yx/styles/communityIcon_ex5aikhvi3i41.png')
-        embed.set_footer(text=f'Requested by {ctx.message.author} • Page {index} of 3', icon_url=ctx.message.author.avatar_url)
+        embed.set_footer(text=f'Requested by {ctx.message.author} • Page {index} of {pages}', icon_url=ctx.message.author.avatar_url)
         msg = await ctx.send(embed=embed)
 
-        def predicate(message, l, r):
-            def check(reaction, user):
-                if reaction.message.id != message.id or user == self.bot.user:
-                    return False
-                if l and reaction.emoji == left and user == ctx.message.author:
-                    return True
-                if r and reaction.emoji == right and user == ctx.message.author:
-                    return True
-                return False
-            return check
-
-        while True:
-            for reaction in reactions:
-                await msg.add_reaction(reaction)
-            l = index != 1
-            r = index != 3
-            try:
-                react, self.user = await self.bot.wait_for('reaction_add', check=predicate(msg, l, r), timeout=120)
-            except asyncio.TimeoutError:
-                await msg.delete()
-
-            if react.emoji == left and index > 1:
+        #Page turns | Only the author can turn the pages, the timeout restarts on every turn
+        async def turn(emoji, user):
+            nonlocal index
+            if emoji == left and index > 1:
                 index -= 1
-                await msg.remove_reaction(left, self.user)
-            elif react.emoji == right and index < 3:
+            elif emoji == right and index < pages:
                 index += 1
-                await msg.remove_reaction(right, self.user)
+            else:
+                return
+            await msg.remove_reaction(emoji, user)
 
             embed.clear_fields()
-            number = index * 5
+            number = index * PAGE
 
-            if category == 'Hot':
-                submissions = list(self.red.subreddit('Coronavirus').hot(limit=15))[number-5:number]
-            elif category == 'New':
-                submissions = list(self.red.subreddit('Coronavirus').new(limit=15))[number-5:number]
-            elif category == 'Top':
-                submissions = list(self.red.subreddit('Coronavirus').top(limit=15))[number-5:number]
+            for name, value in fields[number-PAGE:number]:
+                embed.add_field(name=name, value=value, inline=False)
 
-            for s in submissions:
-                embed.add_field(name=f'<:upvote:689186080070959207> **{s.score}** | Posted by u/{s.author} on {datetime.fromtimestamp(s.created).strftime("%m/%d/%y %H:%M:%S")}', value=f'[{s.title}](https://www.reddit.com{s.permalink})', inline=False)
-
-            embed.set_footer(text=f'Requested by {ctx.message.author} • Page {index} of 3', icon_url=ctx.message.author.avatar_url)
+            embed.set_footer(text=f'Requested by {ctx.message.author} • Page {index} of {pages}', icon_url=ctx.message.author.avatar_url)
             await msg.edit(embed=embed)
 
+        self.bot.reactions.register(msg, ctx.author, reactions, turn, msg.delete, timeout=120)
+        for reaction in reactions:
+            await msg.add_reaction(reaction)
+
 def setup(bot):
     bot.add_cog(Reddit(bot))
@@ -1,302 +1,341 @@
+import copy
 import discord
 import io
-import os
-import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 import logging
-import asyncio
-import gc
-import requests
+import time
+import config
 from datetime import datetime
 from discord.ext import commands
 from utils.codes import states, alt_names, alpha2, alpha3, JHU_names
+from utils import render, raster
+from utils.cache import LRUCache, SingleFlight
+from utils.data import METRICS, Record, normalize, select
+from utils.voice import counter_name
 
 logger = logging.getLogger('covid-19')
 
+#Most locations one stat command compares
+COMPARE_LIMIT = 10
+
 class Stats(commands.Cog):
 
     def __init__(self, bot):
         self.bot = bot
+        self.graphs = LRUCache(getattr(config, 'graph_cache_size', 32 * 2**20))
+        #Renders of the same graph and data that overlap are drawn once
+        self.flights = SingleFlight()
+        #Stat embed payloads | Counted by entry
+        self.embeds = LRUCache(getattr(config, 'embed_cache_size', 1024), sizeof=lambda payload: 1)
+        #Backend for the three line stat graph | matplotlib, or raster to draw it directly with Pillow
+        self.backend = raster if getattr(config, 'graph_backend', 'matplotlib') == 'raster' else render
+        #Graph requests from users | (locations, type, graph_type): [count, last requested]
+        self.requests = {}
+        self.warming = None
+
+    def cog_unload(self):
+        if self.warming is not None:
+            self.warming.cancel()
+
+    async def cog_check(self, ctx):
+        if self.bot.refresher.ready:
+            return True
+        await ctx.send('Data is still loading, please try again in a moment')
+        return False
+
+    #Key for a rendered graph | Changes as soon as the data of any of its locations changes
+    def graphKey(self, data, locations, type, graph_type):
+        return (tuple(locations), type, graph_type, data.revision('jhu', *locations))
+
+    #Rendered graph from the cache, or drawn in the render pool | type is a metric, or stat for the three line stat graph
+    async def renderGraph(self, data, locations, type, graph_type, request=True):
+        if request:
+            key = (tuple(locations), type, graph_type)
+            count = self.requests.get(key, [0, 0])[0]
+            self.requests[key] = [count + 1, time.monotonic()]
+        key = self.graphKey(data, locations, type, graph_type)
+        png = self.graphs.get(key)
+        if png is None:
+            png = await self.flights.do(key, self.drawGraph, key, data, locations, type, graph_type)
+        return png
+
+    async def drawGraph(self, key, data, locations, type, graph_type):
+        if type == 'stat':
+            series = data.jhu.series[locations[0]]
+            lines = [(name, series[metric], style) for name, metric, style in render.STAT_LINES]
+            png = await self.bot.renderer.run(self.backend.plot, data.jhu.dates, lines, graph_type)
+        else:
+            lines = [(location, data.jhu.series[location][type], {}) for location in locations]
+            png = await self.bot.renderer.run(render.plot, data.jhu.dates, lines, graph_type, type.title())
+        self.graphs.put(key, png)
+        return png
+
+    #Graphs worth rendering before anyone asks | Global, the countries with the most cases and anything graphed in the last day, most requested first
+    def hotGraphs(self, data):
+        day = time.monotonic() - 86400
+        for key in [key for key, (count, last) in self.requests.items() if last < day]:
+            del self.requests[key]
+
+        records = sorted(data.world.values(), key=lambda record: record.confirmed, reverse=True)
+        countries = [JHU_names.get(record.name, record.name) for record in records]
+        countries = [country for country in countries if country in data.jhu.series][:getattr(config, 'warm_countries', 10)]
+        hot = [(('ALL',), 'stat', graph_type) for graph_type in render.TITLES]
+        hot += [((country,), 'stat', graph_type) for country in countries for graph_type in render.TITLES]
+        hot += [key for key in self.requests if key not in hot]
+        hot.sort(key=lambda key: self.requests.get(key, [0])[0], reverse=True)
+        return [key for key in hot if all(location in data.jhu.series for location in key[0])][:getattr(config, 'warm_graphs', 30)]
+
+    #Render the hot set one graph at a time, so the pool stays free for users
+    async def warm(self, data):
+        start = time.monotonic()
+        rendered = 0
+        for locations, type, graph_type in self.hotGraphs(data):
+            if self.graphKey(data, locations, type, graph_type) in self.graphs:
+                continue
+            try:
+                await self.renderGraph(data, list(locations), type, graph_type, request=False)
+                rendered += 1
+            except Exception as e:
+                logger.warning(f'Graph warm up | {locations} {type} {graph_type} failed: {e!r}')
+        logger.info(f'Graph warm up | {rendered} rendered in {time.monotonic() - start:.1f}s')
+
+    #Row a stat embed is built from | (table, key) or None without data
+    def statRow(self, location, state):
+        if location == 'ALL':
+            return ('world', normalize('Total:'))
+        if not state:
+            return ('world', normalize(location))
+        if state in list(states.values()):
+            return ('us', normalize(state))
+        if location == 'Canada':
+            return ('jhu', 'Canada')
+        return None
+
+    #Look up every field of the location at once
+    def statRecord(self, data, location, state):
+        table, key = self.statRow(location, state)
+        if table != 'jhu':
+            return getattr(data, table).get(key)
+        province = data.jhu.province(state)
+        if province is None:
+            return None
+        confirmed, deaths, recovered = (int(province[metric][-1]) for metric in METRICS)
+        new_confirmed = confirmed - int(province['confirmed'][-2])
+        new_deaths = deaths - int(province['deaths'][-2])
+        return Record(state, confirmed, new_confirmed, deaths, new_deaths, recovered, confirmed - deaths - recovered, 0)
+
+    def statEmbed(self, data, location, state, hint=True):
+        '''Stat embed for a location, None without data | hint adds the graph reaction line
+
+        Payloads are built once and reused until the row they show changes
+        '''
+        row = self.statRow(location, state)
+        if row is None:
+            return None
+        key = (location, state, hint, *row, data.revision(*row))
+        payload = self.embeds.get(key)
+        if payload is None:
+            record = self.statRecord(data, location, state)
+            if record is None:
+                return None
+            payload = self.buildEmbed(record, location, state, hint).to_dict()
+            self.embeds.put(key, payload)
+        embed = discord.Embed.from_dict(copy.deepcopy(payload))
+        embed.timestamp = datetime.utcnow()
+        return embed
+
+    def buildEmbed(self, record, location, state, hint):
+        confirmed, new_confirmed, deaths, new_deaths, recovered, active = record.confirmed, record.new_confirmed, record.deaths, record.new_deaths, record.recovered, record.active
+
+        if len(state) > 0:
+            name =  f'Coronavirus (COVID-19) Cases | {state}, {location}'
+        else:
+            name = f'Coronavirus (COVID-19) Cases | {location}'
+
+        if int(new_confirmed) > 0:
+            new_confirmed = f'(+{int(new_confirmed)})'
+        elif new_confirmed == 0:
+            new_confirmed = ''
+
+        if int(new_deaths) > 0:
+            new_deaths = f'(+{int(new_deaths)})'
+        elif new_deaths == 0:
+            new_deaths = ''
+
+        mortality_rate = recovery_rate = 0
+        if confirmed != 0:
+            mortality_rate = round((deaths/confirmed * 100), 2)
+            recovery_rate = round((recovered/confirmed * 100), 2)
+
+        description='**Vote** <:dbl:689485017667469327> [TOP.GG](https://top.gg/bot/683462722368700526/vote) | **Donate** <:Kofi:689483361785217299> [Ko-fi](https://ko-fi.com/picklejason) | **Join** <:discord:689486285349715995> [Support Server](https://discord.gg/tVN2UTa)'
+        if hint:
+            description += ' \n React with 📈 for a **linear** graph or 📉 for a **log** graph'
+        embed = discord.Embed(
+            description=description,
+            colour=discord.Colour.red()
+            )
+        embed.add_field(name='<:confirmed:689494326493184090> Confirmed', value= f'**{int(confirmed)}** {new_confirmed}')
+        embed.add_field(name='<:deaths:689489690101153800> Deaths', value=f'**{int(deaths)}** {new_deaths}')
+        if state:
+            embed.set_author(name=name, url='https://www.worldometers.info/coronavirus/country/us/', icon_url='https://images.discordapp.net/avatars/683462722368700526/70c1743a2d87a44116f857a88bb107e0.png?size=512')
+            embed.add_field(name='<:activecases:689494177733410861> Active Cases', value=f'**{int(active)}**')
+            embed.add_field(name='<:mortalityrate:689488380865544345> Mortality Rate', value=f'**{mortality_rate}%**')
 
-    #Parse Data
-    confirmed_url = 'https://raw.githubusercontent.com/CSSEGISandData/COVID-19/master/csse_covid_19_data/csse_covid_19_time_series/time_series_covid19_confirmed_global.csv'
-    deaths_url = 'https://raw.githubusercontent.com/CSSEGISandData/COVID-19/master/csse_covid_19_data/csse_covid_19_time_series/time_series_covid19_deaths_global.csv'
-    recovered_url = 'https://raw.githubusercontent.com/CSSEGISandData/COVID-19/master/csse_covid_19_data/csse_covid_19_time_series/time_series_covid19_recovered_global.csv'
-    confirmed_df = pd.read_csv(confirmed_url, error_bad_lines=False).dropna(axis=1, how='all')
-    deaths_df = pd.read_csv(deaths_url, error_bad_lines=False).dropna(axis=1, how='all')
-    recovered_df = pd.read_csv(recovered_url, error_bad_lines=False).dropna(axis=1, how='all')
-
-    header = {
-      "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/50.0.2661.75 Safari/537.36",
-      "X-Requested-With": "XMLHttpRequest"
-    }
-
-    wom_url = 'https://www.worldometers.info/coronavirus/'
-    us_wom_url = 'https://www.worldometers.info/coronavirus/country/us/'
-    r = requests.get(wom_url, headers=header)
-    r1 = requests.get(us_wom_url, headers=header)
-
-    df_list = pd.read_html(r.text)
-    us_df_list = pd.read_html(r1.text)
-    df = df_list[0].replace(np.nan, 0).replace(',', '', regex=True)
-    us_df = us_df_list[0].replace(np.nan, 0).replace(',', '', regex=True)
-
-    def getTotal(self, type):
-        df_all = self.df[self.df['Country,Other'].str.match('Total:', na=False)][type].values[0]
-        return df_all
-
-    #type: 'Country,Other', 'TotalCases', 'TotalDeaths', 'NewDeaths', 'TotalRecovered', 'ActiveCases', 'Serious,Critical'
-    def getLocation(self, location, type):
-        df_loc = self.df[self.df['Country,Other'].str.match(location, na=False)][type].values[0]
-        return df_loc
-
-    def getState(self, state, type):
-        df_state = self.us_df[self.us_df['USAState'].str.match(state, na=False)][type].values[0]
-        return df_state
-
-    #Statistics Command
-    @commands.command(name='stat', aliases=['stats', 'statistic', 's', 'cases'])
-    @commands.cooldown(3, 10, commands.BucketType.user)
-    async def stat(self, ctx, location = 'ALL', state = ''):
-
-        #Parameter formatting | Check if country code
-        if len(location) == 2 or len(location) == 3:
-            location = location.upper()
         else:
-            location = location.title()
+            embed.set_author(name=name, url='https://www.worldometers.info/coronavirus/', icon_url='https://images.discordapp.net/avatars/683462722368700526/70c1743a2d87a44116f857a88bb107e0.png?size=512')
+            embed.add_field(name='<:recovered:689490988808274003> Recovered', value=f'**{int(recovered)}**')
+            embed.add_field(name='<:activecases:689494177733410861> Active Cases', value=f'**{int(active)}**')
+            embed.add_field(name='<:mortalityrate:689488380865544345> Mortality Rate', value=f'**{mortality_rate}%**')
+            embed.add_field(name='<:recoveryrate:689492820125417521> Recovery Rate', value=f'**{recovery_rate}%**')
+        embed.set_footer(text='Data from Worldometer and Johns Hopkins CSSE')
+        return embed
+
+    @commands.Cog.listener()
+    async def on_stats_refresh(self, data):
+        self.graphs.prune(lambda key: key[3] < data.revision('jhu', *key[0]))
+        self.embeds.prune(lambda key: key[5] < data.revision(key[3], key[4]))
+        logger.info(f'Graph cache | {self.graphs.stats()}')
+        logger.info(f'Graph renders | {self.flights.stats()}')
+        if data.ready:
+            if self.warming is not None:
+                self.warming.cancel()
+            self.warming = self.bot.loop.create_task(self.warm(data))
+
+    #Worldometer name of a country | Full names, ISO codes and alternative names
+    def resolveCountry(self, country):
+        if len(country) == 2 or len(country) == 3:
+            country = country.upper()
+        else:
+            country = country.title()
+
+        if country in alpha2:
+            country = alpha2[country]
+        elif country in alpha3:
+            country = alpha3[country]
+        elif country in alt_names:
+            country = alt_names[country]
+        return country
+
+    #US state or Canadian province named after the country, '' when it is not one
+    def resolveState(self, data, location, state):
         if len(state) == 2:
             state = state.upper()
         else:
             state = state.title()
 
-        if location in alpha2:
-            location = alpha2[location]
-        elif location in alpha3:
-            location = alpha3[location]
-        elif location in alt_names:
-            location = alt_names[location]
-
         if state in states:
             state = states[state]
 
-        #Check if data exists for location
-        if location == 'ALL' or (location in list(alpha2.values())) :
-
-            #Parse and sum data
-            if location == 'ALL':
-                confirmed = self.getTotal('TotalCases')
-                new_confirmed = self.getTotal('NewCases')
-                deaths = self.getTotal('TotalDeaths')
-                new_deaths = self.getTotal('NewDeaths')
-                recovered = self.getTotal('TotalRecovered')
-                active = self.getTotal('ActiveCases')
+        if location == 'USA' and state in states.values():
+            return state
+        if location == 'Canada' and data.jhu is not None and any(country == 'Canada' and normalize(province) == normalize(state)
+                                        for province, country in zip(data.jhu.provinces, data.jhu.countries)):
+            return state
+        return ''
+
+    def compareEmbed(self, data, locations):
+        '''One embed comparing several locations, None without data for any | Counts come from a single selection over the Worldometer columns'''
+        keys = {normalize('Total:') if location == 'ALL' else normalize(location): location for location in locations}
+        found, counts = select(data.columns['world'], list(keys))
+        if not found:
+            return None
+        confirmed, new_confirmed, deaths, new_deaths, recovered, active, critical = counts.T
+        cases = np.maximum(confirmed, 1)
+        mortality = np.where(confirmed > 0, np.round(deaths / cases * 100, 2), 0)
+        recovery = np.where(confirmed > 0, np.round(recovered / cases * 100, 2), 0)
 
-            else:
-                if state:
-                    if state in list(states.values()):
-                        confirmed = self.getState(state, 'TotalCases')
-                        new_confirmed = self.getState(state, 'NewCases')
-                        deaths = self.getState(state, 'TotalDeaths')
-                        new_deaths = self.getState(state, 'NewDeaths')
-                        active = self.getState(state, 'ActiveCases')
-                    elif location == 'Canada':
-                        confirmed = self.confirmed_df[self.confirmed_df['Province/State'].str.contains(state, na=False)].iloc[:,-1].sum()
-                        prev_confirmed = self.confirmed_df[self.confirmed_df['Province/State'].str.contains(state, na=False)].iloc[:,-2].sum()
-                        deaths = self.deaths_df[self.deaths_df['Province/State'].str.contains(state, na=False)].iloc[:,-1].sum()
-                        prev_deaths = self.deaths_df[self.deaths_df['Province/State'].str.contains(state, na=False)].iloc[:,-2].sum()
-                        recovered = self.recovered_df[self.recovered_df['Province/State'].str.contains(state, na=False)].iloc[:,-1].sum()
-                        active = confirmed - deaths - recovered
-                        new_confirmed = confirmed - prev_confirmed
-                        new_deaths = deaths - prev_deaths
-                    else:
-                        await ctx.send('There is no available data for this location | Use **.c help** for more info on commands')
-                else:
-                    confirmed = self.getLocation(location, 'TotalCases')
-                    new_confirmed = self.getLocation(location, 'NewCases')
-                    deaths = self.getLocation(location, 'TotalDeaths')
-                    new_deaths = self.getLocation(location, 'NewDeaths')
-                    recovered = self.getLocation(location, 'TotalRecovered')
-                    active = self.getLocation(location, 'ActiveCases')
-
-            if len(state) > 0:
-                name =  f'Coronavirus (COVID-19) Cases | {state}, {location}'
-            else:
-                name = f'Coronavirus (COVID-19) Cases | {location}'
+        embed = discord.Embed(
+            description='**Vote** <:dbl:689485017667469327> [TOP.GG](https://top.gg/bot/683462722368700526/vote) | **Donate** <:Kofi:689483361785217299> [Ko-fi](https://ko-fi.com/picklejason) | **Join** <:discord:689486285349715995> [Support Server](https://discord.gg/tVN2UTa)',
+            colour=discord.Colour.red(),
+            timestamp=datetime.utcnow()
+            )
+        embed.set_author(name='Coronavirus (COVID-19) Cases | Comparison', url='https://www.worldometers.info/coronavirus/', icon_url='https://images.discordapp.net/avatars/683462722368700526/70c1743a2d87a44116f857a88bb107e0.png?size=512')
+        for key, row in zip(found, zip(*(column.tolist() for column in (confirmed, new_confirmed, deaths, new_deaths, recovered, active, mortality, recovery)))):
+            c, nc, d, nd, r, a, m, rr = row
+            value = (f'<:confirmed:689494326493184090> **{c}** {f"(+{nc})" if nc > 0 else ""}\n'
+                     f'<:deaths:689489690101153800> **{d}** {f"(+{nd})" if nd > 0 else ""}\n'
+                     f'<:recovered:689490988808274003> **{r}**\n'
+                     f'<:activecases:689494177733410861> **{a}**\n'
+                     f'<:mortalityrate:689488380865544345> **{m}%** | <:recoveryrate:689492820125417521> **{rr}%**')
+            embed.add_field(name='All' if keys[key] == 'ALL' else keys[key], value=value)
+        embed.set_footer(text='Data from Worldometer')
+        return embed
+
+    async def compare(self, ctx, data, locations):
+        if len(locations) > COMPARE_LIMIT:
+            await ctx.send(f'Compare up to {COMPARE_LIMIT} locations at once | Use **.c help** for more info on commands')
+            return
+        for location in locations:
+            if location != 'ALL' and normalize(location) not in data.world:
+                await ctx.send(f'{location} is not a valid location', delete_after=3)
+        embed = self.compareEmbed(data, locations)
+        if embed is None:
+            await ctx.send('There is no available data for these locations | Use **.c help** for more info on commands')
+            return
+        await ctx.send(embed=embed)
 
-            if int(new_confirmed) > 0:
-                new_confirmed = f'(+{int(new_confirmed)})'
-            elif new_confirmed == 0:
-                new_confirmed = ''
+    #Statistics Command
+    @commands.command(name='stat', aliases=['stats', 'statistic', 's', 'cases'])
+    @commands.cooldown(3, 10, commands.BucketType.user)
+    async def stat(self, ctx, location = 'ALL', *more):
 
-            if int(new_deaths) > 0:
-                new_deaths = f'(+{int(new_deaths)})'
-            elif new_deaths == 0:
-                new_deaths = ''
+        #Use the same snapshot for the whole command, including graphs rendered later
+        data = self.bot.refresher.snapshot
 
-            if confirmed != 0:
-                mortality_rate = round((deaths/confirmed * 100), 2)
-                if state:
-                    pass
-                else:
-                    recovery_rate = round((recovered/confirmed * 100), 2)
+        #Several locations get one comparison embed | A single state or province only follows the US or Canada
+        location = self.resolveCountry(location)
+        state = self.resolveState(data, location, more[0]) if len(more) == 1 else ''
+        if len(more) > 1 or (more and not state):
+            await self.compare(ctx, data, [location] + [self.resolveCountry(country) for country in more])
+            return
 
-            if state:
-                description='**Vote** <:dbl:689485017667469327> [TOP.GG](https://top.gg/bot/683462722368700526/vote) | **Donate** <:Kofi:689483361785217299> [Ko-fi](https://ko-fi.com/picklejason) | **Join** <:discord:689486285349715995> [Support Server](https://discord.gg/tVN2UTa)'
-            else:
-                description='**Vote** <:dbl:689485017667469327> [TOP.GG](https://top.gg/bot/683462722368700526/vote) | **Donate** <:Kofi:689483361785217299> [Ko-fi](https://ko-fi.com/picklejason) | **Join** <:discord:689486285349715995> [Support Server](https://discord.gg/tVN2UTa) \n React with 📈 for a **linear** graph or 📉 for a **log** graph'
-            embed = discord.Embed(
-                description=description,
-                colour=discord.Colour.red(),
-                timestamp=datetime.utcnow()
-                )
-            embed.add_field(name='<:confirmed:689494326493184090> Confirmed', value= f'**{int(confirmed)}** {new_confirmed}')
-            embed.add_field(name='<:deaths:689489690101153800> Deaths', value=f'**{int(deaths)}** {new_deaths}')
-            if state:
-                embed.set_author(name=name, url='https://www.worldometers.info/coronavirus/country/us/', icon_url='https://images.discordapp.net/avatars/683462722368700526/70c1743a2d87a44116f857a88bb107e0.png?size=512')
-                embed.add_field(name='<:activecases:689494177733410861> Active Cases', value=f'**{int(active)}**')
-                embed.add_field(name='<:mortalityrate:689488380865544345> Mortality Rate', value=f'**{mortality_rate}%**')
+        #Check if data exists for location
+        if location == 'ALL' or (location in list(alpha2.values())) :
 
-            else:
-                embed.set_author(name=name, url='https://www.worldometers.info/coronavirus/', icon_url='https://images.discordapp.net/avatars/683462722368700526/70c1743a2d87a44116f857a88bb107e0.png?size=512')
-                embed.add_field(name='<:recovered:689490988808274003> Recovered', value=f'**{int(recovered)}**')
-                embed.add_field(name='<:activecases:689494177733410861> Active Cases', value=f'**{int(active)}**')
-                embed.add_field(name='<:mortalityrate:689488380865544345> Mortality Rate', value=f'**{mortality_rate}%**')
-                embed.add_field(name='<:recoveryrate:689492820125417521> Recovery Rate', value=f'**{recovery_rate}%**')
-            embed.set_footer(text='Data from Worldometer and Johns Hopkins CSSE')
+            #Only offer graphs when there is a series to draw
+            series = JHU_names.get(location, location)
+            graphable = not state and data.jhu is not None and series in data.jhu.series
+            embed = self.statEmbed(data, location, state, hint=graphable)
+            if embed is None:
+                await ctx.send('There is no available data for this location | Use **.c help** for more info on commands')
+                return
             msg = await ctx.send(embed=embed)
+            if not graphable:
+                return
 
             #Graph reactions
             linear = '📈'
             log = '📉'
-            graphs = [linear, log]
-            def predicate(message):
-                def check(reaction, user):
-                    if reaction.message.id != message.id or user == self.bot.user:
-                        return False
-                    if reaction.emoji == linear and user == ctx.message.author:
-                        return True
-                    if reaction.emoji == log and user == ctx.message.author:
-                        return True
-                    return False
-                return check
-
-            if location in JHU_names:
-                location = JHU_names[location]
-
-            #Plot graph function
-            async def plot(graph_type):
-
-                fig = plt.figure(dpi=150)
-                plt.style.use('dark_background')
-
-                if location == 'ALL':
-                    if graph_type == 'linear':
-                        ax = self.confirmed_df.iloc[:,4:].sum().plot(label='Confirmed', color='orange', marker='o')
-                        ax = self.recovered_df.iloc[:,4:].sum().plot(label='Recovered', color='lightgreen', marker='o')
-                        ax = self.deaths_df.iloc[:,4:].sum().plot(label='Deaths', color='red', marker='o')
-                    elif graph_type == 'log':
-                        ax = self.confirmed_df.iloc[:,4:].sum().plot(label='Confirmed', logy=True, color='orange', marker='o')
-                        ax = self.recovered_df.iloc[:,4:].sum().plot(label='Recovered', logy=True, color='lightgreen', marker='o')
-                        ax = self.deaths_df.iloc[:,4:].sum().plot(label='Deaths', logy=True, color='red', marker='o')
-
-                else:
-                    if graph_type == 'linear':
-                        ax = self.confirmed_df[self.confirmed_df['Country/Region'].str.contains(location, na=False)].iloc[:,4:].sum().plot(label='Confirmed', color='orange', marker='o')
-                        ax = self.recovered_df[self.recovered_df['Country/Region'].str.contains(location, na=False)].iloc[:,4:].sum().plot(label='Recovered', color='lightgreen', marker='o')
-                        ax = self.deaths_df[self.deaths_df['Country/Region'].str.contains(location, na=False)].iloc[:,4:].sum().plot(label='Deaths', color='red', marker='o')
-                    elif graph_type == 'log':
-                        ax = self.confirmed_df[self.confirmed_df['Country/Region'].str.contains(location, na=False)].iloc[:,4:].sum().plot(label='Confirmed', logy=True, color='orange', marker='o')
-                        ax = self.recovered_df[self.recovered_df['Country/Region'].str.contains(location, na=False)].iloc[:,4:].sum().plot(label='Recovered', logy=True, color='lightgreen', marker='o')
-                        ax = self.deaths_df[self.deaths_df['Country/Region'].str.contains(location, na=False)].iloc[:,4:].sum().plot(label='Deaths', color='red', marker='o')
-
-                if graph_type == 'linear':
-                    filename = './graphs/lineargraph.png'
-                    ax.set_ylim(0)
-                    plt.title('Linear Graph')
-
-                elif graph_type == 'log':
-                    filename = './graphs/loggraph.png'
-                    ax.set_ylim(10**2)
-                    plt.title('Logarithmic Graph')
-                    plt.minorticks_off()
-
-                ax.legend(loc='upper left', fancybox=True, facecolor='0.2')
-                ax.yaxis.grid()
-                ax.spines['top'].set_visible(False)
-                ax.spines['right'].set_visible(False)
-                ax.spines['left'].set_visible(False)
-                locs, _ = plt.yticks()
-                ylabels = []
-                for l in locs:
-                    lab = str(int(l)).replace('00000000', '00M').replace('0000000', '0M').replace('000000', 'M').replace('00000', '00K').replace('0000', '0K').replace('000', 'K')
-                    if not ('K' in lab or 'M' in lab):
-                        lab = '{:,}'.format(int(lab))
-                    ylabels.append(lab)
-                plt.yticks(locs, ylabels)
-                plt.savefig(filename, transparent=True)
-                plt.cla()
-                plt.close(fig)
-                plt.close('all')
-                gc.collect()
-                with open(filename, 'rb') as f:
-                    file = io.BytesIO(f.read())
-                image = discord.File(file, filename=f'{graph_type}graph.png')
-
-                return image
-
-            if state:
-                pass
-            else:
-                for graph in graphs:
-                    await msg.add_reaction(graph)
+            graphs = {linear: 'linear', log: 'log'}
 
-            while True:
+            #Rendered graphs are shared between commands until the location's data changes
+            async def react(emoji, user):
+                graph_type = graphs[emoji]
+                self.bot.reactions.remove(msg.id)
                 try:
-                    react, self.user = await self.bot.wait_for('reaction_add', check=predicate(msg), timeout=30)
-                except asyncio.TimeoutError:
-                    description='**Vote** <:dbl:689485017667469327> [TOP.GG](https://top.gg/bot/683462722368700526/vote) | **Donate** <:Kofi:689483361785217299> [Ko-fi](https://ko-fi.com/picklejason) | **Join** <:discord:689486285349715995> [Support Server](https://discord.gg/tVN2UTa)'
-                    embed = discord.Embed(
-                        description=description,
-                        colour=discord.Colour.red(),
-                        timestamp=datetime.utcnow()
-                        )
-                    embed.set_author(name=name, url='https://www.worldometers.info/coronavirus/', icon_url='https://images.discordapp.net/avatars/683462722368700526/70c1743a2d87a44116f857a88bb107e0.png?size=512')
-                    embed.add_field(name='<:confirmed:689494326493184090> Confirmed', value= f'**{int(confirmed)}** {new_confirmed}')
-                    embed.add_field(name='<:deaths:689489690101153800> Deaths', value=f'**{int(deaths)}** {new_deaths}')
-                    embed.add_field(name='<:recovered:689490988808274003> Recovered', value=f'**{int(recovered)}**')
-                    embed.add_field(name='<:activecases:689494177733410861> Active Cases', value=f'**{int(active)}**')
-                    embed.add_field(name='<:mortalityrate:689488380865544345> Mortality Rate', value=f'**{mortality_rate}%**')
-                    embed.add_field(name='<:recoveryrate:689492820125417521> Recovery Rate', value=f'**{recovery_rate}%**')
-                    embed.set_footer(text='Data from Worldometer and Johns Hopkins CSSE')
-                    await msg.edit(embed=embed)
-                    await msg.remove_reaction(linear, self.bot.user)
-                    await msg.remove_reaction(log, self.bot.user)
-
-                graph_type = ''
-                if react.emoji == linear:
-                    graph_type = 'linear'
-                    await msg.remove_reaction(linear, self.user)
-                    await msg.remove_reaction(linear, self.bot.user)
-                    image = await plot(graph_type)
+                    png = await self.renderGraph(data, [series], 'stat', graph_type)
+                    file = discord.File(io.BytesIO(png), filename=f'{graph_type}graph.png')
                     embed.set_image(url=f'attachment://{graph_type}graph.png')
                     await msg.delete()
-                    await ctx.send(file=image, embed=embed)
-
-                elif react.emoji == log:
-                    graph_type = 'log'
-                    await msg.remove_reaction(log, self.user)
+                    await ctx.send(file=file, embed=embed)
+                except Exception:
+                    #The route is gone, so take the hint and reactions off here and let the user know
+                    logger.exception(f'Graph for {series} {graph_type} failed')
+                    await expire()
+                    await ctx.send('The graph could not be drawn, please try again in a moment')
+
+            async def expire():
+                try:
+                    await msg.edit(embed=self.statEmbed(data, location, state, hint=False))
+                    await msg.remove_reaction(linear, self.bot.user)
                     await msg.remove_reaction(log, self.bot.user)
-                    image = await plot(graph_type)
-                    embed.set_image(url=f'attachment://{graph_type}graph.png')
-                    await msg.delete()
-                    await ctx.send(file=image, embed=embed)
-
-                if os.path.exists(f'./graphs/{graph_type}graph.png'):
-                    os.remove(f'./graphs/{graph_type}graph.png')
-                else:
+                except discord.NotFound:
                     pass
 
+            self.bot.reactions.register(msg, ctx.author, graphs, react, expire, timeout=30)
+            for graph in graphs:
+                await msg.add_reaction(graph)
+
         else:
             await ctx.send('There is no available data for this location | Use **.c help** for more info on commands')
 
@@ -304,81 +343,29 @@ class Stats(commands.Cog):
     @commands.cooldown(3, 10, commands.BucketType.user)
     async def graph(self, ctx, graph_type, type, *location):
 
+        data = self.bot.refresher.snapshot
+        if graph_type not in render.TITLES or type not in METRICS:
+            await ctx.send('Use **.c graph <linear/log> <confirmed/recovered/deaths> <country names>** | Use **.c help** for more info on commands')
+            return
+
         countries = []
         #Parameter formatting | Check if country code
         for country in location:
-            if len(country) == 2 or len(country) == 3:
-                country = country.upper()
-            else:
-                country = country.title()
-
-            if country in alpha2:
-                country = alpha2[country]
-            elif country in alpha3:
-                country = alpha3[country]
-            elif country in alt_names:
-                country = alt_names[country]
-
-            if country in JHU_names:
-                country = JHU_names[country]
-
-            countries.append(country)
-
-        fig = plt.figure(dpi=150)
-        plt.style.use('dark_background')
+            country = self.resolveCountry(country)
+            countries.append(JHU_names.get(country, country))
 
+        valid = []
         for country in countries:
-            if country in list(alpha2.values()) or country in list(JHU_names.values()):
-                if graph_type == 'linear':
-                    if type == 'confirmed':
-                        ax = self.confirmed_df[self.confirmed_df['Country/Region'].str.contains(country, na=False)].iloc[:,4:].sum().plot(label=country)
-                    elif type == 'recovered':
-                        ax = self.recovered_df[self.recovered_df['Country/Region'].str.contains(country, na=False)].iloc[:,4:].sum().plot(label=country)
-                    elif type == 'deaths':
-                        ax = self.deaths_df[self.deaths_df['Country/Region'].str.contains(country, na=False)].iloc[:,4:].sum().plot(label=country)
-
-                elif graph_type == 'log':
-                    if type == 'confirmed':
-                        ax = self.confirmed_df[self.confirmed_df['Country/Region'].str.contains(country, na=False)].iloc[:,4:].sum().plot(label=country, logy=True)
-                    elif type == 'recovered':
-                        ax = self.recovered_df[self.recovered_df['Country/Region'].str.contains(country, na=False)].iloc[:,4:].sum().plot(label=country, logy=True)
-                    elif type == 'deaths':
-                        ax = self.deaths_df[self.deaths_df['Country/Region'].str.contains(country, na=False)].iloc[:,4:].sum().plot(label=country, logy=True)
+            if country in data.jhu.series:
+                valid.append(country)
             else:
                 await ctx.send(f'{country} is not a valid location', delete_after=3)
+        if not valid:
+            await ctx.send('There is no available data for these locations | Use **.c graph <linear/log> <confirmed/recovered/deaths> <country names>**')
+            return
 
-        if graph_type == 'linear':
-            filename = './graphs/lineargraph.png'
-            ax.set_ylim(0)
-            plt.title(f'{type.title()} Linear Graph')
-
-        elif graph_type == 'log':
-            filename = './graphs/loggraph.png'
-            ax.set_ylim(10**2)
-            plt.title(f'{type.title()} Logarithmic Graph')
-            plt.minorticks_off()
-
-        ax.legend(loc='upper left', fancybox=True, facecolor='0.2')
-        ax.yaxis.grid()
-        ax.spines['top'].set_visible(False)
-        ax.spines['right'].set_visible(False)
-        ax.spines['left'].set_visible(False)
-        locs, _ = plt.yticks()
-        ylabels = []
-        for l in locs:
-            lab = str(int(l)).replace('00000000', '00M').replace('0000000', '0M').replace('000000', 'M').replace('00000', '00K').replace('0000', '0K').replace('000', 'K')
-            if not ('K' in lab or 'M' in lab):
-                lab = '{:,}'.format(int(lab))
-            ylabels.append(lab)
-        plt.yticks(locs, ylabels)
-        plt.savefig(filename, transparent=True)
-        plt.cla()
-        plt.close(fig)
-        plt.close('all')
-        gc.collect()
-        with open(filename, 'rb') as f:
-            file = io.BytesIO(f.read())
-        image = discord.File(file, filename=f'{graph_type}graph.png')
+        png = await self.renderGraph(data, valid, type, graph_type)
+        image = discord.File(io.BytesIO(png), filename=f'{graph_type}graph.png')
         # description='**Vote** <:dbl:689485017667469327> [TOP.GG](https://top.gg/bot/683462722368700526/vote) | **Donate** <:Kofi:689483361785217299> [Ko-fi](https://ko-fi.com/picklejason) | **Join** <:discord:689486285349715995> [Support Server](https://discord.gg/tVN2UTa)'
         embed = discord.Embed(
             # description=description,
@@ -390,11 +377,6 @@ class Stats(commands.Cog):
         embed.set_footer(text=f'Requested by {ctx.message.author}', icon_url=ctx.message.author.avatar_url)
         await ctx.send(file=image, embed=embed)
 
-        if os.path.exists(f'./graphs/{graph_type}graph.png'):
-            os.remove(f'./graphs/{graph_type}graph.png')
-        else:
-            pass
-
     @commands.command()
     @commands.cooldown(3, 10, commands.BucketType.user)
     async def vcset(self, ctx, channel: discord.VoiceChannel, *, location = 'All', state = ''):
@@ -415,29 +397,17 @@ class Stats(commands.Cog):
             location = alt_names[location]
         if state in states:
             state = states[state]
+        if location in JHU_names:
+            location = JHU_names[location]
 
-        while True:
-            #Check if data exists for location
-            if location == 'All' or location == 'Other' or self.confirmed_df['Country/Region'].str.contains(location).any():
-                #Parse Data
-                if location == 'All':
-                    confirmed = self.confirmed_df.iloc[:,-1].sum()
-                    deaths = self.deaths_df.iloc[:,-1].sum()
-                    # recovered = self.recovered_df.iloc[:,-1].sum()
-                elif location == 'Other':
-                    confirmed = self.confirmed_df[~self.confirmed_df['Country/Region'].str.contains('China', na=False)].iloc[:,-1].sum()
-                    deaths = self.deaths_df[~self.deaths_df['Country/Region'].str.contains('China', na=False)].iloc[:,-1].sum()
-                    # recovered = self.recovered_df[~self.recovered_df['Country/Region'].str.contains('China', na=False)].iloc[:,-1].sum()
-                else:
-                    confirmed = self.confirmed_df[self.confirmed_df['Country/Region'].str.match(location, na=False)].iloc[:,-1].sum()
-                    deaths = self.deaths_df[self.deaths_df['Country/Region'].str.match(location, na=False)].iloc[:,-1].sum()
-                    # recovered = self.recovered_df[self.recovered_df['Country/Region'].str.match(location, na=False)].iloc[:,-1].sum()
-            else:
-                await ctx.send('There is no available data for this location | Use **.c help** for more info on commands')
-
-            await channel.edit(name=f'😷 {location}: {str(confirmed)}')
+        #Check if data exists for location
+        if counter_name(self.bot.refresher.snapshot, location) is None:
+            await ctx.send('There is no available data for this location | Use **.c help** for more info on commands')
+            return
 
-            await asyncio.sleep(86400)
+        #Renamed by the bot's scheduler now and after every refresh that changes the count
+        self.bot.voice.add(channel, location)
+        await ctx.send(f'{channel.mention} will show the cases for {location}')
 
 def setup(bot):
     bot.add_cog(Stats(bot))
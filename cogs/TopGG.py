@@ -1,15 +1,48 @@
-import dbl
-import discord
+import aiohttp
+import asyncio
+import logging
 from discord.ext import commands
 import config
 
+logger = logging.getLogger('covid-19')
+
+STATS_URL = 'https://top.gg/api/bots/{}/stats'
+
 class TopGG(commands.Cog):
     """Handles interactions with the top.gg API"""
 
     def __init__(self, bot):
         self.bot = bot
         self.token = config.dbl_token # set this to your DBL token
-        self.dblpy = dbl.DBLClient(self.bot, self.token, autopost=True) # Autopost will post your guild count every 30 minutes
+        self.interval = getattr(config, 'dbl_interval', 1800) # post the guild count every 30 minutes
+        #With several clusters only the first posts, with the totals over all of them
+        self.task = self.bot.loop.create_task(self.autopost()) if self.bot.cluster in (None, 0) else None
+
+    def cog_unload(self):
+        if self.task is not None:
+            self.task.cancel()
+
+    async def post(self, session):
+        counters = self.bot.counters
+        #Wait for the supervisor's totals rather than posting one cluster's count
+        if self.bot.ipc and counters.cluster is None:
+            return
+        data = {'server_count': counters.all_guilds, 'shard_count': counters.all_shards}
+        async with session.post(STATS_URL.format(self.bot.user.id), json=data, headers={'Authorization': self.token}) as r:
+            r.raise_for_status()
+        logger.info(f'Posted {data} to top.gg')
+
+    async def autopost(self):
+        await self.bot.wait_until_ready()
+        while self.bot.ipc and self.bot.counters.cluster is None:
+            await asyncio.sleep(5)
+        async with aiohttp.ClientSession() as session:
+            while True:
+                try:
+                    await self.post(session)
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    logger.exception('Failed to post the guild count to top.gg')
+                await asyncio.sleep(self.interval)
 
 def setup(bot):
     bot.add_cog(TopGG(bot))
@@ -1,30 +1,82 @@
+import argparse
 import discord
 import os
 import config
 import asyncio
 import logging
-import google.cloud.logging
-from google.cloud.logging.handlers import CloudLoggingHandler
+import logging.handlers
+import threading
 from discord.utils import find
 from discord.ext import commands
 from discord.ext.commands import when_mentioned_or
 from datetime import datetime
+from utils import render, raster
+from utils.cluster import ClusterClient
+from utils.counters import Counters
+from utils.pool import WorkerPool
+from utils.reactions import ReactionRouter
+from utils.refresher import Refresher
+from utils.voice import VoiceCounters
 
-logging_client = google.cloud.logging.Client()
-cloud_logger = logging_client.logger('covid-19')
 logger = logging.getLogger('covid-19')
 logger.setLevel(logging.DEBUG)
-handler = CloudLoggingHandler(logging_client)
-handler.setFormatter(logging.Formatter('%(asctime)s:%(levelname)s:%(name)s: %(message)s'))
-logger.addHandler(handler)
+
+def setup_logging(buffer):
+    '''Attach Cloud Logging and pass on what was logged while it loaded
+
+    Importing the client library and looking up credentials takes seconds, so it runs beside the gateway connection
+    '''
+    try:
+        import google.cloud.logging
+        from google.cloud.logging.handlers import CloudLoggingHandler
+        handler = CloudLoggingHandler(google.cloud.logging.Client())
+    except Exception:
+        handler = logging.StreamHandler()
+        logger.exception('Cloud Logging is unavailable, logging to stderr')
+    handler.setFormatter(logging.Formatter('%(asctime)s:%(levelname)s:%(name)s: %(message)s'))
+    logger.addHandler(handler)
+    logger.removeHandler(buffer)
+    buffer.setTarget(handler)
+    buffer.close()
 
 class Coronavirus(commands.AutoShardedBot):
-    def __init__(self):
+    '''The whole bot, or one cluster of it owning shard_ids when started by cluster.py'''
+
+    def __init__(self, shard_ids=None, shard_count=None, cluster=None, ipc=None):
         super().__init__(
             command_prefix=when_mentioned_or('.c '),
-            activity=discord.Game(name="Loading...")
+            activity=discord.Game(name="Loading..."),
+            shard_ids=shard_ids,
+            shard_count=shard_count
             )
+        self.cluster = cluster
         self.remove_command('help')
+        self.refresher = Refresher(
+            self,
+            intervals=getattr(config, 'refresh_intervals', None),
+            timeouts=getattr(config, 'refresh_timeouts', None),
+            path=getattr(config, 'snapshot_path', './data/snapshot.dat'),
+            workers=getattr(config, 'parse_workers', 2),
+            parse_timeout=getattr(config, 'parse_timeout', 120),
+            #With several clusters the first downloads and publishes, the rest map what it publishes
+            follow=bool(cluster)
+            )
+        self.refresher.load()
+        self.refresher.start()
+        #Graphs are drawn in worker processes that already have the stat graph backend imported
+        backend = raster if getattr(config, 'graph_backend', 'matplotlib') == 'raster' else render
+        self.renderer = WorkerPool(getattr(config, 'render_workers', 2), getattr(config, 'render_timeout', 30), initializer=backend.init)
+        self.loop.create_task(self.renderer.warm())
+        #Graph and page reactions for every open message
+        self.reactions = ReactionRouter(self)
+        self.reactions.start()
+        #Voice channel counters set with .c vcset, renamed after each refresh
+        self.voice = VoiceCounters(self, getattr(config, 'voice_path', './data/voice.db'), getattr(config, 'voice_interval', 2))
+        self.voice.start()
+        #Guild and user counts, recounted in full on ready and every hour
+        self.counters = Counters(self, getattr(config, 'reconcile_interval', 3600))
+        #Totals across clusters come from the supervisor
+        self.ipc = ClusterClient(self, ipc, cluster) if ipc else None
         self.load()
 
     def load(self):
@@ -47,18 +99,48 @@ class Coronavirus(commands.AutoShardedBot):
 
     async def on_ready(self):
         await self.wait_until_ready()
+        self.counters.reset()
+        self.counters.start()
+        if self.ipc:
+            self.ipc.start()
         while True:
-            await bot.change_presence(activity=discord.Activity(type=discord.ActivityType.watching, name=f'{len(bot.guilds)} servers | .c help'))
-            self.unload_extension('cogs.Stats')
-            self.load_extension('cogs.Stats')
-            logger.info('Reloaded Stats')
+            await bot.change_presence(activity=discord.Activity(type=discord.ActivityType.watching, name=f'{self.counters.all_guilds} servers | .c help'))
             await asyncio.sleep(600)
 
+    async def on_stats_refresh(self, snapshot):
+        self.voice.refresh(snapshot)
+
+    async def on_raw_reaction_add(self, payload):
+        if payload.user_id != self.user.id:
+            await self.reactions.dispatch(payload)
+
+    async def on_raw_message_delete(self, payload):
+        self.reactions.remove(payload.message_id)
+
+    async def close(self):
+        self.reactions.stop()
+        self.voice.stop()
+        self.counters.stop()
+        if self.ipc:
+            self.ipc.stop()
+        await self.refresher.stop()
+        self.renderer.shutdown()
+        await super().close()
+
+    async def on_member_join(self, member):
+        self.counters.member(member.guild, 1)
+
+    async def on_member_remove(self, member):
+        self.counters.member(member.guild, -1)
+
     async def on_guild_join(self, guild: discord.Guild):
+        self.counters.join(guild)
         general = find(lambda x: x.name == 'general', guild.text_channels)
         channel = bot.get_channel(686768403339542687)
-        embed_join = discord.Embed(description=f'Joined server **{guild.name}** with **{len(guild.members)}** members | Total: **{len(self.guilds)}** servers', timestamp=datetime.utcnow(), colour=discord.Colour.green())
-        await channel.send(embed=embed_join)
+        embed_join = discord.Embed(description=f'Joined server **{guild.name}** with **{guild.member_count}** members | Total: **{self.counters.all_guilds}** servers', timestamp=datetime.utcnow(), colour=discord.Colour.green())
+        #The log channel belongs to one cluster only
+        if channel is not None:
+            await channel.send(embed=embed_join)
         if general and general.permissions_for(guild.me).send_messages:
             embed = discord.Embed(
                     description='Thanks for inviting me! | Use **.c help** for more info on commands \n Please vote for me on <:dbl:689485017667469327> [TOP.GG](https://top.gg/bot/683462722368700526/vote) | Join the <:discord:689486285349715995> [Support Server](https://discord.gg/tVN2UTa)',
@@ -66,11 +148,8 @@ class Coronavirus(commands.AutoShardedBot):
                     )
             embed.set_author(name='Coronavirus (COVID-19)', url='https://discord.gg/tVN2UTa', icon_url='https://images.discordapp.net/avatars/683462722368700526/70c1743a2d87a44116f857a88bb107e0.png?size=512')
             embed.add_field(name='Command Prefix', value='`.c ` or `@mention`')
-            users = 0
-            for s in self.guilds:
-                users += len(s.members)
-            embed.add_field(name='Servers | Shards', value=f'<:servers:689502498251341953> {len(self.guilds)} | {len(self.shards)}')
-            embed.add_field(name='Users', value=f'<:user:689502620590669912> {users}')
+            embed.add_field(name='Servers | Shards', value=f'<:servers:689502498251341953> {self.counters.all_guilds} | {self.counters.all_shards}')
+            embed.add_field(name='Users', value=f'<:user:689502620590669912> {self.counters.all_users}')
             embed.add_field(name='Bot Source Code', value='<:github:689501322969350158> [Github](https://github.com/picklejason/coronavirus-bot)')
             embed.add_field(name='Bot Invite', value='<:discord:689486285349715995> [Link](https://discordapp.com/api/oauth2/authorize?client_id=683462722368700526&permissions=59456&scope=bot)')
             embed.add_field(name='Donate', value='<:Kofi:689483361785217299> [Ko-fi](https://ko-fi.com/picklejason)')
@@ -78,10 +157,22 @@ class Coronavirus(commands.AutoShardedBot):
             await general.send(embed=embed)
 
     async def on_guild_remove(self, guild: discord.Guild):
+        self.counters.remove(guild)
         channel = bot.get_channel(686768403339542687)
-        embed_leave = discord.Embed(description=f'Left server **{guild.name}** with **{len(guild.members)}** members | Total: **{len(self.guilds)}** servers', timestamp=datetime.utcnow(), colour=discord.Colour.red())
-        await channel.send(embed=embed_leave)
+        embed_leave = discord.Embed(description=f'Left server **{guild.name}** with **{guild.member_count}** members | Total: **{self.counters.all_guilds}** servers', timestamp=datetime.utcnow(), colour=discord.Colour.red())
+        if channel is not None:
+            await channel.send(embed=embed_leave)
 
 if __name__ == '__main__':
-    bot = Coronavirus()
+    #Records wait here until Cloud Logging is ready
+    buffer = logging.handlers.MemoryHandler(10000, flushLevel=logging.CRITICAL + 1)
+    logger.addHandler(buffer)
+    threading.Thread(target=setup_logging, args=(buffer,), daemon=True).start()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cluster', type=int)
+    parser.add_argument('--shards', type=int, nargs='+')
+    parser.add_argument('--shard-count', type=int)
+    parser.add_argument('--ipc')
+    args = parser.parse_args()
+    bot = Coronavirus(args.shards, args.shard_count, args.cluster, args.ipc)
     bot.run(config.token)
@@ -0,0 +1,84 @@
+import asyncio
+from collections import OrderedDict
+
+class LRUCache:
+    '''Least recently used cache bounded by the total size of its values
+
+    sizeof measures a value, len fits bytes like rendered PNGs
+    hits and misses count get calls since the cache was created
+    '''
+
+    def __init__(self, max_size, sizeof=len):
+        self.max_size = max_size
+        self.sizeof = sizeof
+        self.items = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def get(self, key):
+        value = self.items.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.items.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        if size > self.max_size:
+            return
+        self.pop(key)
+        self.items[key] = value
+        self.size += size
+        while self.size > self.max_size:
+            _, oldest = self.items.popitem(last=False)
+            self.size -= self.sizeof(oldest)
+
+    def pop(self, key):
+        value = self.items.pop(key, None)
+        if value is not None:
+            self.size -= self.sizeof(value)
+        return value
+
+    def prune(self, stale):
+        for key in [key for key in self.items if stale(key)]:
+            self.pop(key)
+
+    def stats(self):
+        return f'{self.hits} hits | {self.misses} misses | {len(self.items)} items | {self.size} bytes'
+
+class SingleFlight:
+    '''Runs identical concurrent work once | A call whose key is already in flight waits for that result instead
+
+    calls counts every do call, coalesced the ones that joined a call already in flight
+    The work runs as its own task, so a caller that gives up does not cancel it for the others
+    '''
+
+    def __init__(self):
+        self.flights = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def __len__(self):
+        return len(self.flights)
+
+    async def do(self, key, fn, *args):
+        self.calls += 1
+        flight = self.flights.get(key)
+        if flight is None:
+            flight = self.flights[key] = asyncio.ensure_future(fn(*args))
+            flight.add_done_callback(lambda _: self.flights.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(flight)
+
+    def stats(self):
+        return f'{self.calls} calls | {self.coalesced} coalesced | {len(self.flights)} in flight'
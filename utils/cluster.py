@@ -0,0 +1,102 @@
+import asyncio
+import json
+import logging
+import os
+
+logger = logging.getLogger('covid-19')
+
+#Seconds between reports from each cluster
+REPORT = 30
+#Counts summed over every cluster
+FIELDS = ('guilds', 'users', 'shards')
+
+def shard_ranges(shard_count, clusters):
+    '''Contiguous shard ids for each cluster, as even as they can be'''
+    return [list(range(i * shard_count // clusters, (i + 1) * shard_count // clusters)) for i in range(clusters)]
+
+class ClusterServer:
+    '''Runs in the supervisor and sums the counts every cluster reports over a unix socket
+
+    Each cluster sends one JSON line with its counts and gets the totals over all clusters back
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.reports = {}
+        self.server = None
+
+    def totals(self):
+        totals = {field: sum(report[field] for report in self.reports.values()) for field in FIELDS}
+        totals['clusters'] = len(self.reports)
+        return totals
+
+    async def start(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.server = await asyncio.start_unix_server(self.handle, path=self.path)
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    async def handle(self, reader, writer):
+        cluster = None
+        try:
+            async for line in reader:
+                report = json.loads(line)
+                cluster = report['cluster']
+                self.reports[cluster] = {field: int(report[field]) for field in FIELDS}
+                writer.write(json.dumps(self.totals()).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        except (ValueError, KeyError):
+            logger.exception(f'Cluster {cluster} sent a bad report')
+        finally:
+            #A cluster that went away stops counting until it reports again
+            self.reports.pop(cluster, None)
+            writer.close()
+
+class ClusterClient:
+    '''Runs in each cluster, reports its counts to the supervisor and keeps the totals it gets back in bot.counters.cluster'''
+
+    def __init__(self, bot, path, cluster, interval=REPORT):
+        self.bot = bot
+        self.path = path
+        self.cluster = cluster
+        self.interval = interval
+        self.task = None
+
+    def start(self):
+        if self.task is None:
+            self.task = self.bot.loop.create_task(self.run())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    def report(self):
+        counters = self.bot.counters
+        return {'cluster': self.cluster, 'guilds': counters.total_guilds, 'users': counters.total_users, 'shards': len(self.bot.shards)}
+
+    async def run(self):
+        await self.bot.wait_until_ready()
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.path)
+                try:
+                    while True:
+                        writer.write(json.dumps(self.report()).encode() + b'\n')
+                        await writer.drain()
+                        self.bot.counters.cluster = json.loads(await reader.readline())
+                        await asyncio.sleep(self.interval)
+                finally:
+                    writer.close()
+            except (ConnectionError, OSError, ValueError):
+                logger.warning(f'Cluster {self.cluster} lost the supervisor, reconnecting')
+                self.bot.counters.cluster = None
+                await asyncio.sleep(self.interval)
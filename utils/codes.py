@@ -576,5 +576,15 @@ alt_names = {
 JHU_names = {
 'USA': 'US',
 'S. Korea': 'Korea, South',
-'UK': 'United Kingdom'
+'UK': 'United Kingdom',
+'Taiwan': 'Taiwan*',
+'Congo': 'Congo (Brazzaville)',
+'Congo, the Democratic Republic of the': 'Congo (Kinshasa)',
+"Democratic People's Republic of Korea": 'Korea, North',
+"Lao People's Democratic Republic": 'Laos',
+'Cape Verde': 'Cabo Verde',
+'Myanmar': 'Burma',
+'Swaziland': 'Eswatini',
+'Palestine': 'West Bank and Gaza',
+'Federated States of Micronesia': 'Micronesia'
 }
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+from collections import Counter
+
+logger = logging.getLogger('covid-19')
+
+#Seconds between full recounts
+RECONCILE = 3600
+
+class Counters:
+    '''Guild and user counts per shard, kept up to date from gateway events instead of walking every guild
+
+    Users are the member counts Discord reports for each guild
+    A full recount every interval seconds replaces the running counts and logs how far they drifted
+    '''
+
+    def __init__(self, bot, interval=RECONCILE):
+        self.bot = bot
+        self.interval = interval
+        #shard id: count
+        self.guilds = Counter()
+        self.users = Counter()
+        #guild id: members counted for it, so a guild leaves with what it joined with
+        self.members = {}
+        #Totals over every cluster from the supervisor | None when running as a single process
+        self.cluster = None
+        self.task = None
+
+    @property
+    def total_guilds(self):
+        return sum(self.guilds.values())
+
+    @property
+    def total_users(self):
+        return sum(self.users.values())
+
+    #Counts for the whole bot, across clusters when there are several
+    @property
+    def all_guilds(self):
+        return self.cluster['guilds'] if self.cluster else self.total_guilds
+
+    @property
+    def all_users(self):
+        return self.cluster['users'] if self.cluster else self.total_users
+
+    @property
+    def all_shards(self):
+        return self.cluster['shards'] if self.cluster else len(self.bot.shards)
+
+    def start(self):
+        if self.task is None:
+            self.task = self.bot.loop.create_task(self.run())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    def count(self):
+        guilds, users, members = Counter(), Counter(), {}
+        for guild in self.bot.guilds:
+            members[guild.id] = guild.member_count or 0
+            guilds[guild.shard_id] += 1
+            users[guild.shard_id] += members[guild.id]
+        return guilds, users, members
+
+    #Full recount | On ready and every interval, returns the drift of the running totals
+    def reset(self):
+        guilds, users, members = self.count()
+        drift = (sum(guilds.values()) - self.total_guilds, sum(users.values()) - self.total_users)
+        self.guilds, self.users, self.members = guilds, users, members
+        return drift
+
+    def join(self, guild):
+        if guild.id in self.members:
+            return
+        self.members[guild.id] = guild.member_count or 0
+        self.guilds[guild.shard_id] += 1
+        self.users[guild.shard_id] += self.members[guild.id]
+
+    def remove(self, guild):
+        if guild.id not in self.members:
+            return
+        self.guilds[guild.shard_id] -= 1
+        self.users[guild.shard_id] -= self.members.pop(guild.id)
+
+    def member(self, guild, change):
+        if guild.id in self.members:
+            self.members[guild.id] += change
+            self.users[guild.shard_id] += change
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            guilds, users = self.reset()
+            logger.info(f'Counters | {self.total_guilds} guilds ({guilds:+} drift) | {self.total_users} users ({users:+} drift) | per shard {dict(self.guilds)}')
@@ -0,0 +1,347 @@
+import csv
+import json
+import mmap
+import os
+import zlib
+import numpy as np
+from dataclasses import dataclass, field, replace
+from functools import cached_property
+from datetime import datetime
+from typing import NamedTuple
+
+TABLES = ('jhu', 'world', 'us')
+METRICS = ('confirmed', 'deaths', 'recovered')
+
+#Record field: Worldometer column
+WOM_COLUMNS = {
+    'confirmed': 'TotalCases',
+    'new_confirmed': 'NewCases',
+    'deaths': 'TotalDeaths',
+    'new_deaths': 'NewDeaths',
+    'recovered': 'TotalRecovered',
+    'active': 'ActiveCases',
+    'critical': 'Serious,Critical',
+}
+
+class Record(NamedTuple):
+    '''One Worldometer row with every count already cast to int'''
+    name: str
+    confirmed: int
+    new_confirmed: int
+    deaths: int
+    new_deaths: int
+    recovered: int
+    active: int
+    critical: int
+
+def normalize(name):
+    return str(name).strip().casefold()
+
+def record_columns(records):
+    '''Records as one int64 matrix with a row per key and a column per count | (row of each key, matrix)'''
+    rows = {key: row for row, key in enumerate(records)}
+    matrix = np.array([record[1:] for record in records.values()], dtype=np.int64).reshape(len(records), len(Record._fields) - 1)
+    return rows, matrix
+
+def select(columns, keys):
+    '''Counts of many keys with one fancy index | (keys found, matrix with a row each)'''
+    rows, matrix = columns
+    found = [key for key in keys if key in rows]
+    return found, matrix[[rows[key] for key in found]]
+
+@dataclass(frozen=True)
+class TimeSeries:
+    '''JHU time series as one contiguous int32 matrix per metric | regions x days
+
+    provinces and countries are the string table for the matrix rows, '' when a row has no province
+    series maps each country and 'ALL' to {metric: array} summed once when the store is built
+    ingest maps each metric to the matrix row and crc32 of every csv line, used by update_series
+    '''
+    dates: np.ndarray
+    provinces: tuple
+    countries: tuple
+    confirmed: np.ndarray
+    deaths: np.ndarray
+    recovered: np.ndarray
+    series: dict
+    ingest: dict = None
+
+    @property
+    def nbytes(self):
+        matrices = {id(getattr(self, metric)) for metric in METRICS}
+        sums = {}
+        for country in self.series.values():
+            for array in country.values():
+                base = array if array.base is None else array.base
+                if id(base) not in matrices:
+                    sums[id(base)] = base.nbytes
+        strings = sum(len(name) for name in self.provinces + self.countries)
+        return self.dates.nbytes + sum(getattr(self, metric).nbytes for metric in METRICS) + sum(sums.values()) + strings
+
+    #series points into the matrices, pickle only the matrices and rebuild it so worker results stay compact
+    def __reduce__(self):
+        return restore_series, (self.dates, self.provinces, self.countries, {metric: getattr(self, metric) for metric in METRICS}, self.ingest)
+
+    def province(self, name):
+        rows = [i for i, province in enumerate(self.provinces) if normalize(province) == normalize(name)]
+        if not rows:
+            return None
+        return {metric: getattr(self, metric)[rows].sum(axis=0) for metric in METRICS}
+
+def restore_series(dates, provinces, countries, matrices, ingest=None):
+    return TimeSeries(dates, provinces, countries, series=build_index(countries, matrices), ingest=ingest, **matrices)
+
+def build_series(confirmed_df, deaths_df, recovered_df):
+    '''Align the three JHU tables on one row table and date axis and pack them as int32'''
+    #pandas is only needed to parse, which runs in the refresher's worker processes
+    import pandas as pd
+    frames = dict(zip(METRICS, (confirmed_df, deaths_df, recovered_df)))
+    days = min(frame.shape[1] - 4 for frame in frames.values())
+    dates = pd.to_datetime(confirmed_df.columns[4:4 + days], format='%m/%d/%y').values.astype('datetime64[D]')
+
+    #Recovered has different rows than confirmed and deaths so use the union, missing rows are zero
+    values = {}
+    for metric, frame in frames.items():
+        keys = pd.MultiIndex.from_arrays([frame['Province/State'].fillna(''), frame['Country/Region']])
+        values[metric] = pd.DataFrame(frame.iloc[:, 4:4 + days].fillna(0).values, index=keys).groupby(level=[0, 1], sort=False).sum()
+    regions = values['confirmed'].index
+    for metric in METRICS[1:]:
+        regions = regions.append(values[metric].index.difference(regions, sort=False))
+    matrices = {metric: np.ascontiguousarray(values[metric].reindex(regions, fill_value=0).values, dtype=np.int32) for metric in METRICS}
+    provinces = tuple(regions.get_level_values(0))
+    countries = tuple(regions.get_level_values(1))
+    return restore_series(dates, provinces, countries, matrices)
+
+def build_index(countries, matrices):
+    '''Sum the rows of every country once | Returns {country: {metric: array}} with the global total under 'ALL'
+
+    Countries with a single row point straight into the matrices, only countries split into provinces are summed
+    '''
+    names, rows, counts = np.unique(countries, return_inverse=True, return_counts=True)
+    order = np.argsort(rows, kind='stable')
+    starts = np.searchsorted(rows[order], np.arange(len(names)))
+    summed = np.flatnonzero(counts > 1)
+    grouped = order[np.isin(rows[order], summed)]
+    offsets = np.cumsum(counts[summed]) - counts[summed]
+    sums = {metric: np.add.reduceat(matrix[grouped], offsets, axis=0) if len(summed) else matrix[:0] for metric, matrix in matrices.items()}
+
+    index = {'ALL': {metric: matrix.sum(axis=0, dtype=np.int64) for metric, matrix in matrices.items()}}
+    for i, name in enumerate(names):
+        if counts[i] == 1:
+            index[str(name)] = {metric: matrix[order[starts[i]]] for metric, matrix in matrices.items()}
+        else:
+            j = np.searchsorted(summed, i)
+            index[str(name)] = {metric: sums[metric][j] for metric in matrices}
+    return index
+
+def _lines(text):
+    lines = text.splitlines()
+    return lines[0].split(',')[4:], [line for line in lines[1:] if line]
+
+def _split(line, days):
+    '''Split a JHU csv line into its (province, country) key and date values | Only the quoted names need the csv module'''
+    head, _, _, *values = line.rsplit(',', days + 2)
+    names = next(csv.reader([head]))
+    return (tuple(names) if len(names) == 2 else None), values
+
+def ingest_state(series, texts):
+    regions = {key: row for row, key in enumerate(zip(series.provinces, series.countries))}
+    state = {}
+    for metric, text in zip(METRICS, texts):
+        dates, lines = _lines(text)
+        rows = [regions.get(_split(line, len(dates))[0], -1) for line in lines]
+        state[metric] = (np.array(rows, dtype=np.int32), np.array([zlib.crc32(line.encode()) for line in lines], dtype=np.uint32))
+    return state
+
+def update_series(series, confirmed, deaths, recovered):
+    '''Parse only what changed since series was built | None when a full parse is needed
+
+    Date columns appended upstream are read from the end of each line. A line whose older part no longer
+    matches its stored crc32 was corrected upstream and only that line is read in full.
+    New or removed regions and a rewritten date axis need a full parse.
+    '''
+    if not series.ingest:
+        return None
+    known = [f'{d.month}/{d.day}/{d.year % 100}' for d in series.dates.astype(object)]
+    days = len(known)
+    regions = {key: row for row, key in enumerate(zip(series.provinces, series.countries))}
+
+    parsed = {}
+    for metric, text in zip(METRICS, (confirmed, deaths, recovered)):
+        dates, lines = _lines(text)
+        if dates[:days] != known:
+            return None
+        added = len(dates) - days
+        rows, crcs = series.ingest[metric]
+        previous = dict(zip(crcs.tolist(), rows.tolist()))
+        if len(previous) != len(crcs) or len(set(rows.tolist())) != len(rows):
+            return None
+
+        appended, corrected, state = [], [], []
+        for line in lines:
+            prefix, *tail = line.rsplit(',', added) if added else (line,)
+            crc = zlib.crc32(prefix.encode())
+            row = previous.get(crc)
+            if row is None:
+                key, values = _split(line, len(dates))
+                row = regions.get(key)
+                if row is None:
+                    return None
+                corrected.append((row, values))
+            elif row >= 0:
+                appended.append((row, tail))
+            state.append((row, zlib.crc32(line[len(prefix):].encode(), crc)))
+        if {row for row, _ in state} != set(rows.tolist()):
+            return None
+        parsed[metric] = (dates, appended, corrected, state)
+
+    total = min(len(dates) for dates, *_ in parsed.values())
+    matrices = {}
+    ingest = {}
+    for metric, (dates, appended, corrected, state) in parsed.items():
+        matrix = np.zeros((len(regions), total), dtype=np.int32)
+        matrix[:, :days] = getattr(series, metric)
+        for row, values in appended:
+            matrix[row, days:] = [int(value) if value else 0 for value in values[:total - days]]
+        for row, values in corrected:
+            matrix[row] = [int(value) if value else 0 for value in values[:total]]
+        matrices[metric] = matrix
+        ingest[metric] = (np.array([row for row, _ in state], dtype=np.int32), np.array([crc for _, crc in state], dtype=np.uint32))
+
+    import pandas as pd
+    new_dates = pd.to_datetime(parsed['confirmed'][0][days:total], format='%m/%d/%y').values.astype('datetime64[D]')
+    dates = np.concatenate([series.dates, new_dates])
+    return restore_series(dates, series.provinces, series.countries, matrices, ingest)
+
+def diff_records(old, new):
+    '''Keys of Worldometer records that were added, removed or have any count changed'''
+    if old is None:
+        return set(new)
+    changed = set(new).symmetric_difference(old)
+    common = [key for key in new if key in old]
+    if common:
+        before = np.array([old[key][1:] for key in common], dtype=np.int64)
+        after = np.array([new[key][1:] for key in common], dtype=np.int64)
+        changed.update(np.array(common, dtype=object)[(before != after).any(axis=1)])
+    return changed
+
+def diff_series(old, new):
+    '''Countries whose time series changed | Every country when the date axis or the rows changed, since every graph gets a new point'''
+    if old is None or not np.array_equal(old.dates, new.dates) or old.provinces != new.provinces or old.countries != new.countries:
+        return set(new.series)
+    rows = np.zeros(len(new.countries), dtype=bool)
+    for metric in METRICS:
+        rows |= (getattr(old, metric) != getattr(new, metric)).any(axis=1)
+    changed = {new.countries[row] for row in np.flatnonzero(rows)}
+    if changed:
+        changed.add('ALL')
+    return changed
+
+DIFFS = {'jhu': diff_series, 'world': diff_records, 'us': diff_records}
+
+@dataclass(frozen=True)
+class Snapshot:
+    '''Every data table at one point in time | Never modified, the refresher publishes a new one instead
+
+    version increases with every publish and is the key for anything derived from the data
+    fetched maps each source to the time its tables were downloaded
+    world and us map normalized Worldometer names to a Record
+    jhu is the TimeSeries store
+    changed holds the (table, key) pairs that differ from the previous snapshot, like ('jhu', 'Italy') or ('world', 'italy')
+    revisions maps (table, key) to the version it last changed in, so derived data for unchanged locations can be kept
+    '''
+    version: int = 0
+    fetched: dict = field(default_factory=dict)
+    jhu: TimeSeries = None
+    world: dict = None
+    us: dict = None
+    changed: frozenset = frozenset()
+    revisions: dict = field(default_factory=dict)
+
+    @property
+    def ready(self):
+        return all(getattr(self, name) is not None for name in TABLES)
+
+    #Worldometer counts by column for selecting many locations at once | Built on first use for each snapshot
+    @cached_property
+    def columns(self):
+        return {name: record_columns(getattr(self, name) or {}) for name in ('world', 'us')}
+
+    def revision(self, table, *keys):
+        return max((self.revisions.get((table, key), 0) for key in keys), default=0)
+
+    def update(self, source, tables):
+        version = self.version + 1
+        changed = frozenset((name, key) for name, table in tables.items() for key in DIFFS[name](getattr(self, name), table))
+        return replace(self, version=version, fetched={**self.fetched, source: datetime.utcnow()}, changed=changed,
+                       revisions={**self.revisions, **dict.fromkeys(changed, version)}, **tables)
+
+#Dataset file | MAGIC, metadata length, JSON metadata, then every array at an ALIGN byte offset
+MAGIC = b'COVIDDS1'
+ALIGN = 64
+
+def save_snapshot(snapshot, path):
+    '''Publish a ready snapshot as one file that any process can map | Written next to path and moved over it with os.replace
+
+    Readers that mapped the previous file keep it until they let go, so nobody ever sees half a dataset
+    '''
+    jhu = snapshot.jhu
+    arrays = {'dates': jhu.dates, 'provinces': np.array(jhu.provinces, dtype=str), 'countries': np.array(jhu.countries, dtype=str),
+              **{metric: getattr(jhu, metric) for metric in METRICS},
+              **{f'{metric}_{name}': array for metric, arrays in (jhu.ingest or {}).items() for name, array in zip(('rows', 'crcs'), arrays)}}
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    layout, offset = {}, 0
+    for name, array in arrays.items():
+        layout[name] = [array.dtype.str, array.shape, offset]
+        offset += -(-array.nbytes // ALIGN) * ALIGN
+    meta = json.dumps({
+        'version': snapshot.version,
+        'fetched': {source: time.isoformat() for source, time in snapshot.fetched.items()},
+        'world': [[key, *record] for key, record in snapshot.world.items()],
+        'us': [[key, *record] for key, record in snapshot.us.items()],
+        'revisions': [[table, key, version] for (table, key), version in snapshot.revisions.items()],
+        'changed': [list(key) for key in snapshot.changed],
+        'arrays': layout,
+    }).encode()
+    start = -(-(len(MAGIC) + 8 + len(meta)) // ALIGN) * ALIGN
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    #Each version gets its own temporary file, so a save never writes into a file another save already moved into place
+    tmp = f'{path}.{snapshot.version}.tmp'
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(MAGIC + np.uint64(len(meta)).tobytes() + meta)
+            for name, array in arrays.items():
+                f.seek(start + layout[name][2])
+                f.write(array.tobytes())
+            f.truncate(start + offset)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def load_snapshot(path):
+    '''Map a published snapshot | The matrices are read-only views of the file, shared with every process that maps it'''
+    with open(path, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if buffer[:len(MAGIC)] != MAGIC:
+        raise ValueError(f'{path} is not a snapshot file')
+    length = int(np.frombuffer(buffer, np.uint64, 1, len(MAGIC))[0])
+    meta = json.loads(buffer[len(MAGIC) + 8:len(MAGIC) + 8 + length])
+    start = -(-(len(MAGIC) + 8 + length) // ALIGN) * ALIGN
+    arrays = {name: np.frombuffer(buffer, np.dtype(dtype), int(np.prod(shape)), start + offset).reshape(shape)
+              for name, (dtype, shape, offset) in meta['arrays'].items()}
+
+    matrices = {metric: arrays[metric] for metric in METRICS}
+    ingest = {metric: (arrays[f'{metric}_rows'], arrays[f'{metric}_crcs']) for metric in METRICS} if 'confirmed_rows' in arrays else None
+    jhu = restore_series(arrays['dates'], tuple(arrays['provinces'].tolist()), tuple(arrays['countries'].tolist()), matrices, ingest)
+    return Snapshot(
+        version=meta['version'],
+        fetched={source: datetime.fromisoformat(time) for source, time in meta['fetched'].items()},
+        jhu=jhu,
+        world={key: Record(*record) for key, *record in meta['world']},
+        us={key: Record(*record) for key, *record in meta['us']},
+        changed=frozenset(tuple(key) for key in meta['changed']),
+        revisions={(table, key): version for table, key, version in meta['revisions']},
+        )
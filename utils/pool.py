@@ -0,0 +1,61 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+#Workers start from a clean server process instead of forking the bot with its threads and sockets
+CONTEXT = 'forkserver'
+
+def _warm():
+    return os.getpid()
+
+class WorkerPool:
+    '''Process pool for CPU heavy work with a time limit per call
+
+    A call waits for a free worker before it is handed to the pool, so the time limit only covers running it
+    A call that runs over timeout or a crashed worker replaces the whole pool and kills its processes, since a stuck process cannot be cancelled
+    Calls still running in a replaced pool fail with BrokenProcessPool
+    initializer runs once in every worker, so imports and setup are paid before the first call
+    '''
+
+    def __init__(self, workers, timeout, initializer=None):
+        self.workers = workers
+        self.timeout = timeout
+        self.initializer = initializer
+        self.pool = None
+        self.free = None
+
+    def start(self):
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=self.initializer, mp_context=multiprocessing.get_context(CONTEXT))
+        if self.free is None:
+            self.free = asyncio.Semaphore(self.workers)
+        return self.pool
+
+    #Start every worker now instead of on the first calls
+    async def warm(self):
+        loop = asyncio.get_event_loop()
+        pool = self.start()
+        await asyncio.gather(*(loop.run_in_executor(pool, _warm) for _ in range(self.workers)))
+
+    async def run(self, fn, *args):
+        loop = asyncio.get_event_loop()
+        self.start()
+        async with self.free:
+            pool = self.start()
+            try:
+                return await asyncio.wait_for(loop.run_in_executor(pool, fn, *args), self.timeout)
+            except (asyncio.TimeoutError, BrokenProcessPool):
+                if self.pool is pool:
+                    self.shutdown()
+                raise
+
+    def shutdown(self):
+        if self.pool is not None:
+            #Killing the workers fails whatever they were running with BrokenProcessPool instead of leaving it hanging
+            processes = list((self.pool._processes or {}).values())
+            self.pool.shutdown(wait=False)
+            for process in processes:
+                process.terminate()
+            self.pool = None
@@ -0,0 +1,103 @@
+import io
+import math
+import numpy as np
+from utils.render import TITLES, label
+
+#Same canvas as the matplotlib backend | 6.4 x 4.8 inches at 150 dpi
+WIDTH, HEIGHT = 960, 720
+LEFT, RIGHT, TOP, BOTTOM = 120, 40, 70, 110
+COLORS = {'orange': (255, 165, 0), 'lightgreen': (144, 238, 144), 'red': (255, 0, 0)}
+#Default colours for lines without one, in matplotlib's dark_background order
+CYCLE = ((141, 211, 199), (254, 255, 179), (190, 186, 218), (251, 128, 114), (129, 177, 211), (253, 180, 98))
+WHITE = (255, 255, 255)
+GRID = (200, 200, 200)
+LEGEND = (51, 51, 51)
+MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+fonts = None
+
+def init():
+    '''Runs once in every render worker | Load the fonts before the first graph'''
+    global fonts
+    from PIL import ImageFont
+    fonts = {'tick': ImageFont.load_default(20), 'title': ImageFont.load_default(25)}
+
+#Round tick step with about count ticks between 0 and top
+def ticks(top, count=6):
+    step = 10 ** math.floor(math.log10(max(top, 1) / count))
+    for factor in (1, 2, 5, 10):
+        if top / (step * factor) <= count:
+            break
+    step *= factor
+    return [step * i for i in range(int(top // step) + 2)]
+
+def plot(dates, lines, graph_type, title=''):
+    '''Draw lines against dates straight onto an image and return the PNG bytes | Same arguments as render.plot'''
+    from PIL import Image, ImageDraw
+    if fonts is None:
+        init()
+
+    image = Image.new('RGBA', (WIDTH, HEIGHT), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    width, height = WIDTH - LEFT - RIGHT, HEIGHT - TOP - BOTTOM
+    top = max([int(np.max(values)) for _, values, _ in lines] + [1])
+
+    #Value to pixel row
+    if graph_type == 'log':
+        bottom, top = 2, max(math.ceil(math.log10(max(top, 10**3))), 3)
+        yticks = [10**power for power in range(bottom, top + 1)]
+        scale = lambda values: np.log10(np.maximum(values, 10**bottom))
+    else:
+        yticks = ticks(top)
+        bottom, top = 0, yticks[-1]
+        scale = lambda values: np.asarray(values, dtype=np.float64)
+    def row(values):
+        return TOP + height - (scale(values) - bottom) / (top - bottom) * height
+
+    for value, y in zip(yticks, row(np.array(yticks))):
+        draw.line([(LEFT, y), (LEFT + width, y)], fill=GRID, width=1)
+        draw.text((LEFT - 10, y), label(value), font=fonts['tick'], fill=WHITE, anchor='rm')
+    draw.line([(LEFT, TOP + height), (LEFT + width, TOP + height)], fill=WHITE, width=2)
+
+    #Dates are daily, so the column is the index | Label the first of every few months
+    days = len(dates)
+    column = lambda index: LEFT + index / max(days - 1, 1) * width
+    months = dates.astype('datetime64[M]')
+    starts = np.flatnonzero(months[1:] != months[:-1]) + 1
+    for index in starts[::max(len(starts) // 6, 1)]:
+        month = months[index].astype(object)
+        x = column(index)
+        draw.line([(x, TOP + height), (x, TOP + height + 8)], fill=WHITE, width=2)
+        draw.text((x, TOP + height + 14), f'{MONTHS[month.month - 1]} {month.year}', font=fonts['tick'], fill=WHITE, anchor='mt')
+
+    #At most one point every two pixels, closer points are drawn over each other anyway
+    index = np.unique(np.linspace(0, days - 1, min(days, width // 2)).round().astype(np.intp))
+    x = column(index)
+    for i, (name, values, style) in enumerate(lines):
+        color = COLORS.get(style.get('color'), CYCLE[i % len(CYCLE)])
+        #A marker on every day reads as one thick line at this size
+        points = list(zip(x.tolist(), row(np.asarray(values)[index]).tolist()))
+        draw.line(points, fill=color, width=12 if style.get('marker') else 3)
+        if style.get('marker'):
+            for x0, y0 in points[::8] + points[-1:]:
+                draw.ellipse((x0 - 6, y0 - 6, x0 + 6, y0 + 6), fill=color)
+
+    draw.text((LEFT + width / 2, TOP / 2), f'{title} {TITLES[graph_type]}'.strip(), font=fonts['title'], fill=WHITE, anchor='mm')
+
+    #Legend in the upper left corner
+    entry = 32
+    text = max(draw.textlength(name, font=fonts['tick']) for name, _, _ in lines) if lines else 0
+    box = (LEFT + 15, TOP + 15, LEFT + 15 + 80 + text, TOP + 25 + entry * len(lines))
+    draw.rounded_rectangle(box, radius=6, fill=LEGEND, outline=(128, 128, 128))
+    for i, (name, values, style) in enumerate(lines):
+        color = COLORS.get(style.get('color'), CYCLE[i % len(CYCLE)])
+        y = TOP + 20 + entry * i + entry / 2
+        draw.line([(LEFT + 25, y), (LEFT + 65, y)], fill=color, width=4)
+        if style.get('marker'):
+            draw.ellipse((LEFT + 39, y - 6, LEFT + 51, y + 6), fill=color)
+        draw.text((LEFT + 75, y), name, font=fonts['tick'], fill=WHITE, anchor='lm')
+
+    #Few colours are drawn, so a palette image keeps the alpha and is much quicker to encode
+    buffer = io.BytesIO()
+    image.quantize(64, method=Image.Quantize.FASTOCTREE).save(buffer, format='png')
+    return buffer.getvalue()
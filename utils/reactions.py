@@ -0,0 +1,109 @@
+import asyncio
+import discord
+import logging
+from dataclasses import dataclass, field
+
+logger = logging.getLogger('covid-19')
+
+@dataclass
+class Route:
+    '''An open message waiting for reactions from the user who asked for it
+
+    handler(emoji, user) runs for each of emojis that user adds and expire() once the message goes quiet for timeout seconds
+    '''
+    message: object
+    user: int
+    emojis: frozenset
+    handler: object
+    expire: object
+    timeout: float
+    deadline: float = 0
+    slot: int = 0
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+class ReactionRouter:
+    '''Routes every reaction to the message it was added to with one dict lookup
+
+    Waiting with bot.wait_for runs a check per open message on every reaction in every guild, this stays constant
+    Timeouts are kept on one timer wheel of slots tick seconds wide, advanced by a single task
+    '''
+
+    def __init__(self, bot, tick=1, slots=256):
+        self.bot = bot
+        self.tick = tick
+        self.routes = {}
+        self.wheel = [set() for _ in range(slots)]
+        self.position = None
+        self.task = None
+
+    def __len__(self):
+        return len(self.routes)
+
+    def start(self):
+        if self.task is None:
+            self.task = self.bot.loop.create_task(self.turn())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    def register(self, message, user, emojis, handler, expire=None, timeout=30):
+        route = Route(message, user.id, frozenset(emojis), handler, expire, timeout)
+        self.routes[message.id] = route
+        self.schedule(route)
+        return route
+
+    def remove(self, message_id):
+        route = self.routes.pop(message_id, None)
+        if route is not None:
+            self.wheel[route.slot].discard(message_id)
+        return route
+
+    #Move a route to the slot of its new deadline | Deadlines past a full turn of the wheel wait for a later pass
+    def schedule(self, route):
+        loop = asyncio.get_event_loop()
+        self.wheel[route.slot].discard(route.message.id)
+        route.deadline = loop.time() + route.timeout
+        route.slot = int(route.deadline // self.tick) % len(self.wheel)
+        self.wheel[route.slot].add(route.message.id)
+
+    #Called from on_raw_reaction_add
+    async def dispatch(self, payload):
+        route = self.routes.get(payload.message_id)
+        if route is None or payload.user_id != route.user:
+            return
+        emoji = str(payload.emoji)
+        if emoji not in route.emojis:
+            return
+        self.schedule(route)
+        user = payload.member or discord.Object(payload.user_id)
+        async with route.lock:
+            if route.message.id not in self.routes:
+                return
+            try:
+                await route.handler(emoji, user)
+            except Exception:
+                logger.exception(f'Reaction handler for message {route.message.id} failed')
+
+    async def expire(self, route):
+        async with route.lock:
+            try:
+                await route.expire()
+            except Exception:
+                logger.exception(f'Reaction expiry for message {route.message.id} failed')
+
+    async def turn(self):
+        loop = asyncio.get_event_loop()
+        self.position = int(loop.time() // self.tick)
+        while True:
+            await asyncio.sleep(self.tick)
+            now = loop.time()
+            #Catch up on every slot that fully passed since the last turn, in case the loop was held up
+            while self.position < now // self.tick:
+                slot = self.wheel[self.position % len(self.wheel)]
+                for message_id in [message_id for message_id in slot if self.routes[message_id].deadline <= now]:
+                    route = self.remove(message_id)
+                    if route.expire is not None:
+                        self.bot.loop.create_task(self.expire(route))
+                self.position += 1
@@ -0,0 +1,176 @@
+import asyncio
+import io
+import logging
+import os
+import aiohttp
+from dataclasses import replace
+from utils.data import Snapshot, build_series, ingest_state, load_snapshot, save_snapshot, update_series
+from utils.pool import WorkerPool
+from utils.worldometer import WORLD_TABLE, US_TABLE, parse_records
+
+logger = logging.getLogger('covid-19')
+
+JHU_URL = 'https://raw.githubusercontent.com/CSSEGISandData/COVID-19/master/csse_covid_19_data/csse_covid_19_time_series/time_series_covid19_{}_global.csv'
+WOM_URL = 'https://www.worldometers.info/coronavirus/'
+US_WOM_URL = 'https://www.worldometers.info/coronavirus/country/us/'
+
+HEADER = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/50.0.2661.75 Safari/537.36",
+    "X-Requested-With": "XMLHttpRequest"
+}
+
+def parse_csv(text):
+    import pandas as pd
+    return pd.read_csv(io.StringIO(text), on_bad_lines='skip').dropna(axis=1, how='all')
+
+#Parsers run in worker processes and only send back numpy arrays and Record tuples
+def parse_jhu(previous, confirmed, deaths, recovered):
+    #Append new days to the previous store when possible, corrected rows are re-read on their own
+    if previous is not None:
+        try:
+            series = update_series(previous, confirmed, deaths, recovered)
+        except ValueError:
+            series = None
+        if series is not None:
+            return {'jhu': series}
+    series = build_series(parse_csv(confirmed), parse_csv(deaths), parse_csv(recovered))
+    return {'jhu': replace(series, ingest=ingest_state(series, (confirmed, deaths, recovered)))}
+
+def parse_worldometer(previous, world, us):
+    return {'world': parse_records(world, WORLD_TABLE), 'us': parse_records(us, US_TABLE)}
+
+#Each source is fetched and published as a group | source: (parser, urls passed to it in order, snapshot table passed first)
+SOURCES = {
+    'jhu': (parse_jhu, (JHU_URL.format('confirmed'), JHU_URL.format('deaths'), JHU_URL.format('recovered')), 'jhu'),
+    'worldometer': (parse_worldometer, (WOM_URL, US_WOM_URL), None),
+}
+
+#Seconds between refreshes and seconds allowed for each download
+INTERVALS = {'jhu': 3600, 'worldometer': 600}
+TIMEOUTS = {'jhu': 60, 'worldometer': 30}
+RETRY = 60
+#Parse worker processes and seconds a parse may take before its worker pool is replaced
+WORKERS = 2
+PARSE_TIMEOUT = 120
+#Seconds between checks for a newer published snapshot when following
+FOLLOW = 10
+
+class Refresher:
+    '''Downloads and parses the data sources in the background and publishes the latest good data
+
+    With follow set it downloads nothing and maps each snapshot another process publishes to path instead
+    '''
+
+    def __init__(self, bot, intervals=None, timeouts=None, path=None, workers=WORKERS, parse_timeout=PARSE_TIMEOUT, follow=False):
+        self.bot = bot
+        self.path = path
+        self.follow = follow
+        self.pool = WorkerPool(workers, parse_timeout)
+        self.intervals = {**INTERVALS, **(intervals or {})}
+        self.timeouts = {**TIMEOUTS, **(timeouts or {})}
+        self.snapshot = Snapshot()
+        self.tasks = {}
+        self.session = None
+        #Saves run one at a time and only ever move the published file forward
+        self.saving = asyncio.Lock()
+        self.saved = 0
+
+    @property
+    def ready(self):
+        return self.snapshot.ready
+
+    #Warm start from the last snapshot saved on disk, the network refresh still runs in the background
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            self.snapshot = load_snapshot(self.path)
+            self.saved = self.snapshot.version
+            logger.info(f'Loaded snapshot version {self.snapshot.version} from {self.path}')
+        except Exception:
+            logger.exception(f'Failed to load snapshot from {self.path}')
+
+    def start(self):
+        if self.follow:
+            if 'follow' not in self.tasks:
+                self.tasks['follow'] = self.bot.loop.create_task(self.watch_file())
+            return
+        for source in SOURCES:
+            if source not in self.tasks:
+                self.tasks[source] = self.bot.loop.create_task(self.watch(source))
+
+    async def stop(self):
+        for task in self.tasks.values():
+            task.cancel()
+        self.tasks = {}
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+        self.pool.shutdown()
+
+    async def fetch(self, url, timeout):
+        if self.session is None:
+            self.session = aiohttp.ClientSession(headers=HEADER)
+        async with self.session.get(url, timeout=aiohttp.ClientTimeout(total=timeout)) as r:
+            r.raise_for_status()
+            return await r.text()
+
+    async def refresh(self, source):
+        parser, urls, table = SOURCES[source]
+        texts = await asyncio.gather(*(self.fetch(url, self.timeouts[source]) for url in urls))
+
+        #Parse in worker processes so the GIL stays free for the shards
+        previous = getattr(self.snapshot, table) if table else None
+        tables = await self.pool.run(parser, previous, *texts)
+
+        #Swap in a new snapshot with a single assignment, readers holding the previous one are unaffected
+        #Listeners get it through on_stats_refresh and can use snapshot.changed to keep what did not change
+        snapshot = self.snapshot = self.snapshot.update(source, tables)
+        self.bot.dispatch('stats_refresh', snapshot)
+
+        if self.path and snapshot.ready:
+            await self.save()
+
+    #Publish the latest snapshot | A save that waited behind another writes whatever is newest by then, or nothing
+    async def save(self):
+        async with self.saving:
+            snapshot = self.snapshot
+            if not snapshot.ready or snapshot.version <= self.saved:
+                return
+            try:
+                await asyncio.get_event_loop().run_in_executor(None, save_snapshot, snapshot, self.path)
+                self.saved = snapshot.version
+            except Exception:
+                logger.exception(f'Failed to save snapshot to {self.path}')
+
+    async def watch(self, source):
+        while True:
+            try:
+                await self.refresh(source)
+                logger.info(f'Refreshed {source} | version {self.snapshot.version} | {len(self.snapshot.changed)} changed')
+                delay = self.intervals[source]
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(f'Failed to refresh {source}')
+                delay = min(RETRY, self.intervals[source])
+            await asyncio.sleep(delay)
+
+    #Follower | Map the published file again whenever the publisher flips it to a newer version
+    async def watch_file(self):
+        seen = None
+        while True:
+            try:
+                stat = os.stat(self.path)
+                if (stat.st_ino, stat.st_mtime_ns) != seen:
+                    seen = (stat.st_ino, stat.st_mtime_ns)
+                    snapshot = load_snapshot(self.path)
+                    if snapshot.version > self.snapshot.version:
+                        self.snapshot = snapshot
+                        self.bot.dispatch('stats_refresh', snapshot)
+                        logger.info(f'Mapped snapshot version {snapshot.version} | {len(snapshot.changed)} changed')
+            except FileNotFoundError:
+                pass
+            except Exception:
+                logger.exception(f'Failed to map snapshot from {self.path}')
+            await asyncio.sleep(FOLLOW)
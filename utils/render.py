@@ -0,0 +1,64 @@
+import io
+
+TITLES = {'linear': 'Linear Graph', 'log': 'Logarithmic Graph'}
+
+#Stat graph lines | (label, metric, style)
+STAT_LINES = (
+    ('Confirmed', 'confirmed', {'color': 'orange', 'marker': 'o'}),
+    ('Recovered', 'recovered', {'color': 'lightgreen', 'marker': 'o'}),
+    ('Deaths', 'deaths', {'color': 'red', 'marker': 'o'}),
+)
+
+#One figure and canvas per worker, cleared and drawn again for every graph
+figure = None
+
+def init():
+    '''Runs once in every render worker | Import matplotlib, apply the style and build the figure before the first graph'''
+    global figure
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.style
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    matplotlib.style.use('dark_background')
+    figure = Figure(dpi=150)
+    FigureCanvasAgg(figure)
+
+def label(value):
+    lab = str(int(value)).replace('00000000', '00M').replace('0000000', '0M').replace('000000', 'M').replace('00000', '00K').replace('0000', '0K').replace('000', 'K')
+    if not ('K' in lab or 'M' in lab):
+        lab = '{:,}'.format(int(lab))
+    return lab
+
+def plot(dates, lines, graph_type, title=''):
+    '''Draw lines against dates and return the PNG bytes | lines: [(label, values, style)]'''
+    if figure is None:
+        init()
+    fig = figure
+    fig.clear()
+    ax = fig.add_subplot()
+    for name, values, style in lines:
+        ax.plot(dates, values, label=name, **style)
+    fig.autofmt_xdate()
+
+    if graph_type == 'linear':
+        ax.set_ylim(0)
+    elif graph_type == 'log':
+        ax.set_yscale('log')
+        ax.set_ylim(10**2)
+        ax.minorticks_off()
+    ax.set_title(f'{title} {TITLES[graph_type]}'.strip())
+
+    ax.legend(loc='upper left', fancybox=True, facecolor='0.2')
+    ax.yaxis.grid()
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+    ax.spines['left'].set_visible(False)
+    locs = ax.get_yticks()
+    ax.set_yticks(locs)
+    ax.set_yticklabels([label(l) for l in locs])
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', transparent=True)
+    fig.clear()
+    return buffer.getvalue()
@@ -0,0 +1,150 @@
+import asyncio
+import discord
+import logging
+import os
+import sqlite3
+import time
+
+logger = logging.getLogger('covid-19')
+
+#Discord allows two renames of a channel every ten minutes
+RENAME_WINDOW = 300
+#Seconds between any two renames, so a refresh does not burst every channel at once
+EDIT_INTERVAL = 2
+
+def counter_name(data, location):
+    '''Voice channel name for a location | None without data for it'''
+    series = data.jhu.series
+    if location == 'All':
+        confirmed = series['ALL']['confirmed'][-1]
+    elif location == 'Other':
+        confirmed = series['ALL']['confirmed'][-1] - series['China']['confirmed'][-1]
+    elif location in series:
+        confirmed = series[location]['confirmed'][-1]
+    else:
+        return None
+    return f'😷 {location}: {confirmed}'
+
+class VoiceCounters:
+    '''Voice channels renamed to show the cases of a location, kept in SQLite so they survive restarts
+
+    After each refresh only the channels whose name changed are queued, and a single task renames them
+    interval seconds apart and at most once per RENAME_WINDOW for each channel
+    '''
+
+    def __init__(self, bot, path, interval=EDIT_INTERVAL):
+        self.bot = bot
+        self.interval = interval
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.execute('CREATE TABLE IF NOT EXISTS counters (channel INTEGER PRIMARY KEY, guild INTEGER, location TEXT, name TEXT, edited REAL)')
+        self.db.commit()
+        #channel id: [location, name shown, last rename] | Only channels of guilds on this process's shards, clusters share the file
+        self.counters = {channel: [location, name, edited] for channel, guild, location, name, edited in self.db.execute('SELECT channel, guild, location, name, edited FROM counters')
+                         if self.owns(guild)}
+        #channel id: name to show
+        self.pending = {}
+        self.wake = asyncio.Event()
+        self.task = None
+
+    def owns(self, guild_id):
+        shard_ids = self.bot.shard_ids
+        return shard_ids is None or (guild_id >> 22) % self.bot.shard_count in shard_ids
+
+    def __len__(self):
+        return len(self.counters)
+
+    def start(self):
+        if self.task is None:
+            self.task = self.bot.loop.create_task(self.run())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        self.db.close()
+
+    def add(self, channel, location):
+        #A channel set again keeps its last rename time, the rate limit still applies to it
+        edited = self.counters[channel.id][2] if channel.id in self.counters else 0
+        self.db.execute('INSERT OR REPLACE INTO counters VALUES (?, ?, ?, ?, ?)', (channel.id, channel.guild.id, location, '', edited))
+        self.db.commit()
+        self.counters[channel.id] = [location, '', edited]
+        if self.bot.refresher.ready:
+            self.queue(channel.id, self.bot.refresher.snapshot)
+
+    def remove(self, channel_id):
+        self.db.execute('DELETE FROM counters WHERE channel = ?', (channel_id,))
+        self.db.commit()
+        self.counters.pop(channel_id, None)
+        self.pending.pop(channel_id, None)
+
+    def queue(self, channel_id, data):
+        location, shown, _ = self.counters[channel_id]
+        name = counter_name(data, location)
+        if name is not None and name != shown:
+            self.pending[channel_id] = name
+            self.wake.set()
+        else:
+            self.pending.pop(channel_id, None)
+
+    #Called after every refresh
+    def refresh(self, data):
+        if not data.ready:
+            return
+        for channel_id in self.counters:
+            self.queue(channel_id, data)
+        logger.info(f'Voice counters | {len(self.pending)} of {len(self.counters)} queued')
+
+    #Try a rename again after a window, without touching the rename time saved in SQLite
+    def retry(self, channel_id, name):
+        if channel_id in self.counters:
+            self.counters[channel_id][2] = time.time()
+            self.pending.setdefault(channel_id, name)
+            self.wake.set()
+
+    async def rename(self, channel_id, name):
+        #Drop channels that were deleted or that the bot can no longer edit, only the API can tell
+        channel = self.bot.get_channel(channel_id)
+        try:
+            if channel is None:
+                #Not cached, its guild is unavailable or not loaded yet
+                await self.bot.fetch_channel(channel_id)
+                self.retry(channel_id, name)
+                return
+            await channel.edit(name=name)
+        except (discord.NotFound, discord.Forbidden):
+            logger.info(f'Voice counters | Dropping channel {channel_id}')
+            self.remove(channel_id)
+            return
+        edited = time.time()
+        self.counters[channel_id][1:] = [name, edited]
+        self.db.execute('UPDATE counters SET name = ?, edited = ? WHERE channel = ?', (name, edited, channel_id))
+        self.db.commit()
+
+    async def run(self):
+        await self.bot.wait_until_ready()
+        if self.bot.refresher.ready:
+            self.refresh(self.bot.refresher.snapshot)
+        while True:
+            if not self.pending:
+                self.wake.clear()
+                await self.wake.wait()
+                continue
+            #The channel renamed longest ago goes first, the rest wait for their window
+            channel_id = min(self.pending, key=lambda channel_id: self.counters[channel_id][2])
+            wait = self.counters[channel_id][2] + RENAME_WINDOW - time.time()
+            if wait > 0:
+                self.wake.clear()
+                try:
+                    await asyncio.wait_for(self.wake.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            name = self.pending.pop(channel_id)
+            try:
+                await self.rename(channel_id, name)
+            except discord.HTTPException:
+                logger.exception(f'Voice counters | Failed to rename channel {channel_id}')
+                self.retry(channel_id, name)
+            await asyncio.sleep(self.interval)
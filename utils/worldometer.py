@@ -0,0 +1,53 @@
+import re
+from html import unescape
+from utils.data import Record, WOM_COLUMNS, normalize
+
+WORLD_TABLE = 'main_table_countries_today'
+US_TABLE = 'usa_table_countries_today'
+NAME_COLUMNS = ('Country,Other', 'USAState')
+
+ROW = re.compile(r'<tr[^>]*>(.*?)</tr>', re.S | re.I)
+CELL = re.compile(r'<t[dh][^>]*>(.*?)</t[dh]>', re.S | re.I)
+TAG = re.compile(r'<[^>]*>')
+
+def parse_table(text, table_id):
+    '''Header and cell text of the table with table_id
+
+    Only that table's markup is scanned, row by row, without building a document tree for the rest of the page
+    '''
+    start = text.find(f'id="{table_id}"')
+    if start == -1:
+        raise ValueError(f'Table {table_id} not found')
+    end = text.find('</table>', start)
+    header = None
+    rows = []
+    for row in ROW.finditer(text, start, end if end != -1 else len(text)):
+        cells = [unescape(TAG.sub('', cell)) for cell in CELL.findall(row.group(1))]
+        if header is None:
+            header = [''.join(cell.split()) for cell in cells]
+        else:
+            rows.append(cells)
+    return header or [], rows
+
+def to_int(value):
+    value = value.strip().replace(',', '').replace('+', '')
+    try:
+        return int(value)
+    except ValueError:
+        try:
+            return int(float(value))
+        except ValueError:
+            return 0
+
+def parse_records(text, table_id):
+    '''Turn a Worldometer table into {normalized name: Record} | The first row wins for repeated names like Total:'''
+    header, rows = parse_table(text, table_id)
+    name = next((header.index(column) for column in NAME_COLUMNS if column in header), 1)
+    columns = [header.index(column) if column in header else None for column in WOM_COLUMNS.values()]
+    records = {}
+    for row in rows:
+        if len(row) <= name or not row[name].strip():
+            continue
+        values = [to_int(row[column]) if column is not None and column < len(row) else 0 for column in columns]
+        records.setdefault(normalize(row[name]), Record(row[name].strip(), *values))
+    return records